@@ -0,0 +1,81 @@
+from sqlalchemy import select, func
+from typing import Any, Dict, List
+import hashlib
+import json
+import threading
+
+from data_loader import build_source_query
+from file_storage import content_hash
+
+class CacheStats:
+    """Thread-safe hit/miss counters"""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def record(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else None
+            }
+
+aggregation_cache_stats = CacheStats()
+
+def source_fingerprint(engine, table_name: str, query: str, date_column: str) -> Dict[str, Any]:
+    """
+    Latest date and number of rows of a database source, used to tell whether it
+    changed. Appends (also same-day or back-dated) and deletes change it; rows
+    updated in place without changing the count or latest date do not, and need
+    a run with use_cache off.
+    """
+    src = build_source_query(table_name, query, [date_column]).subquery('watermark_src')
+    with engine.connect() as conn:
+        max_date, row_count = conn.execute(select(func.max(src.c[date_column]), func.count())).one()
+    return {"max_date": max_date, "row_count": row_count}
+
+def aggregation_cache_key(project, config, additional_files: List, engine=None) -> str:
+    """
+    Hash of everything an aggregation result depends on: the main source
+    (file contents, or database query with its latest date and row count), the column mappings,
+    the aggregation settings and each mapped additional file's contents and mapping.
+    Options that do not change the result (streaming, incremental) are left out.
+    """
+    if project.source_type == "file":
+        source = {"sha256": content_hash(project.file_path)}
+    else:
+        source = {
+            "db_connection_id": project.db_connection_id,
+            "table_name": project.table_name,
+            "query": project.query,
+            **source_fingerprint(engine, project.table_name, project.query, project.date_column)
+        }
+
+    key = {
+        "source": source,
+        "columns": [project.date_column, project.value_column, project.product_column],
+        "config": config.model_dump(exclude={"streaming", "incremental", "use_cache"}),
+        "additional_files": [
+            {
+                "sha256": content_hash(add_file.file_path),
+                "date_column": add_file.date_column,
+                "product_column": add_file.product_column,
+                "selected_columns": add_file.selected_columns,
+                "column_aggregations": add_file.column_aggregations,
+                "fill_method": add_file.fill_method
+            }
+            for add_file in additional_files
+        ]
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True, default=str).encode()).hexdigest()
@@ -0,0 +1,252 @@
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import json
+import os
+import uuid
+
+from config import settings
+
+# Sub-directories of ARTIFACTS_DIR by kind of stored frame
+AGGREGATED_ARTIFACTS = "aggregated"
+FEATURE_ARTIFACTS = "features"
+ARTIFACT_KINDS = (AGGREGATED_ARTIFACTS, FEATURE_ARTIFACTS)
+
+def _artifact_dir(kind: str) -> Path:
+    return Path(settings.ARTIFACTS_DIR) / kind
+
+def _as_text(values: pd.Series) -> pd.Series:
+    return values.astype(object).where(values.isna(), values.astype(str))
+
+def _to_arrow(df: pd.DataFrame) -> pa.Table:
+    """
+    Frame as an Arrow table. Columns mixing types (e.g. product ids 1 and "A1"
+    from a JSON source), which Arrow cannot type, are stored as text, the same
+    fallback as reading such sources without their columnar copy.
+    """
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        pass
+
+    df = df.copy()
+    for col in df.columns:
+        values = df[col]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            inferred = pd.api.types.infer_dtype(values.cat.categories, skipna=True)
+        elif values.dtype == object:
+            inferred = pd.api.types.infer_dtype(values, skipna=True)
+        else:
+            continue
+        if inferred.startswith('mixed') and inferred != 'mixed-integer-float':
+            df[col] = _as_text(values)
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+def write_artifact(df: pd.DataFrame, kind: str, project_id: int) -> Tuple[str, int]:
+    """
+    Store a result frame as a Parquet file under ARTIFACTS_DIR/kind and return
+    its path and size in bytes. Every call writes a new file, so the row
+    pointing at the previous one stays valid until the session commits.
+    """
+    path = _artifact_dir(kind) / f"project_{project_id}_{uuid.uuid4().hex}.parquet"
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    try:
+        pq.write_table(
+            _to_arrow(df),
+            tmp_path,
+            compression=settings.ARTIFACT_COMPRESSION,
+            row_group_size=settings.ARTIFACT_ROW_GROUP_SIZE
+        )
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+    return str(path), path.stat().st_size
+
+def read_artifact(record, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Frame stored for an AggregatedData / GeneratedFeatures row, optionally only
+    the given columns. Rows saved before artifacts existed hold their data as
+    JSON records, which are read as before.
+    """
+    if record.artifact_path:
+        return pd.read_parquet(record.artifact_path, columns=columns)
+
+    df = pd.DataFrame(record.data or [])
+    return df[[col for col in columns if col in df.columns]] if columns is not None else df
+
+def artifact_sample(record, rows: int) -> List[Dict[str, Any]]:
+    """First rows of a stored frame as records, reading only the first row group"""
+    if not record.artifact_path:
+        return (record.data or [])[:rows]
+    if rows <= 0:
+        return []
+
+    parquet_file = pq.ParquetFile(record.artifact_path)
+    batch = next(parquet_file.iter_batches(batch_size=rows), None)
+    if batch is None:
+        return []
+    return batch.to_pandas().to_dict('records')
+
+def _row_group_slice(path: str, offset: int, limit: int, columns: Optional[List[str]]) -> pa.Table:
+    """Rows offset..offset+limit, reading only the row groups that hold them"""
+    parquet_file = pq.ParquetFile(path)
+    groups = []
+    first_row = group_start = 0
+    for index in range(parquet_file.num_row_groups):
+        group_rows = parquet_file.metadata.row_group(index).num_rows
+        if group_start + group_rows > offset and group_start < offset + limit:
+            if not groups:
+                first_row = group_start
+            groups.append(index)
+        group_start += group_rows
+
+    if not groups:
+        empty = parquet_file.schema_arrow.empty_table()
+        return empty.select(columns) if columns is not None else empty
+    table = parquet_file.read_row_groups(groups, columns=columns)
+    return table.slice(offset - first_row, limit)
+
+def _timestamp_scalar(value: datetime, arrow_type: pa.DataType) -> pa.Scalar:
+    value = pd.Timestamp(value)
+    if value.tzinfo is not None:
+        value = value.tz_convert(None)  # stored dates are naive UTC
+    return pa.scalar(value.to_datetime64()).cast(arrow_type)
+
+def _typed_values(values: List[str], arrow_type: pa.DataType) -> pa.Array:
+    """
+    Query values (always text) as the column's type; values that do not convert,
+    e.g. "X9" for integer product ids, cannot match any row and are dropped
+    """
+    if pa.types.is_dictionary(arrow_type):
+        arrow_type = arrow_type.value_type
+    converted = []
+    for value in values:
+        try:
+            converted.append(pa.scalar(value).cast(arrow_type).as_py())
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            continue
+    return pa.array(converted, type=arrow_type)
+
+def _filter_expression(schema: pa.Schema, date_column: str = None, date_from: datetime = None,
+                       date_to: datetime = None, product_column: str = None,
+                       products: List[str] = None) -> Optional[ds.Expression]:
+    conditions = []
+    if date_column and date_from is not None:
+        conditions.append(ds.field(date_column) >= _timestamp_scalar(date_from, schema.field(date_column).type))
+    if date_column and date_to is not None:
+        conditions.append(ds.field(date_column) <= _timestamp_scalar(date_to, schema.field(date_column).type))
+    if product_column and products:
+        value_set = _typed_values(products, schema.field(product_column).type)
+        conditions.append(ds.field(product_column).isin(value_set))
+
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+    return expression
+
+def read_artifact_rows(record, offset: int = 0, limit: int = 100, columns: Optional[List[str]] = None,
+                       date_column: str = None, date_from: datetime = None, date_to: datetime = None,
+                       product_column: str = None, products: List[str] = None) -> Tuple[pd.DataFrame, int]:
+    """
+    One page of a stored frame: rows offset..offset+limit among those within
+    [date_from, date_to] and of the given products, only the given columns.
+    Returns the page and the number of matching rows.
+
+    Without filters only the row groups holding the page are read; with filters
+    the matching rows are streamed batch by batch until the page is complete.
+    Legacy JSON rows are filtered in memory.
+    """
+    if not record.artifact_path:
+        df = read_artifact(record)
+        mask = pd.Series(True, index=df.index)
+        if date_column and (date_from is not None or date_to is not None):
+            dates = pd.to_datetime(df[date_column], format='ISO8601')
+            if date_from is not None:
+                mask &= dates >= pd.Timestamp(date_from)
+            if date_to is not None:
+                mask &= dates <= pd.Timestamp(date_to)
+        if product_column and products:
+            mask &= df[product_column].astype(str).isin(products)
+        df = df[mask]
+        if columns is not None:
+            df = df[columns]
+        return df.iloc[offset:offset + limit].reset_index(drop=True), len(df)
+
+    dataset = ds.dataset(record.artifact_path, format='parquet')
+    expression = _filter_expression(dataset.schema, date_column, date_from, date_to, product_column, products)
+    if expression is None:
+        table = _row_group_slice(record.artifact_path, offset, limit, columns)
+        return table.to_pandas(), dataset.count_rows()
+
+    total = dataset.count_rows(filter=expression)
+    batches = []
+    skip, remaining = offset, limit
+    for batch in dataset.to_batches(columns=columns, filter=expression):
+        if skip >= batch.num_rows:
+            skip -= batch.num_rows
+            continue
+        batch = batch.slice(skip, remaining)
+        skip = 0
+        remaining -= batch.num_rows
+        batches.append(batch)
+        if remaining <= 0:
+            break
+
+    schema = dataset.schema if columns is None else pa.schema([dataset.schema.field(col) for col in columns])
+    return pa.Table.from_batches(batches, schema=schema).to_pandas(), total
+
+def page_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Rows as JSON-safe records (NaN -> null, timestamps as ISO strings)"""
+    return json.loads(df.to_json(orient='records', date_format='iso'))
+
+def artifact_page(record, offset: int, limit: int, columns: Optional[List[str]] = None,
+                  date_column: str = None, date_from: datetime = None, date_to: datetime = None,
+                  product_column: str = None, products: List[str] = None) -> Dict[str, Any]:
+    """
+    Page of a stored frame in the shape of DataPageResponse.
+    Raises ValueError for columns the frame does not have and for filters
+    that do not apply to the stored column types.
+    """
+    stored_columns = record.columns or []
+    unknown = [col for col in columns or [] if col not in stored_columns]
+    if unknown:
+        raise ValueError(f"Unknown columns: {', '.join(unknown)}")
+    if products and product_column not in stored_columns:
+        raise ValueError("The data has no product column to filter on")
+    if date_column not in stored_columns:
+        date_column = None
+
+    try:
+        df, total = read_artifact_rows(
+            record, offset, limit, columns,
+            date_column=date_column, date_from=date_from, date_to=date_to,
+            product_column=product_column, products=products
+        )
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError) as e:
+        raise ValueError(f"Cannot filter the data: {e}") from e
+    return {
+        "offset": offset,
+        "limit": limit,
+        "total": total,
+        "columns": df.columns.tolist(),
+        "rows": page_records(df)
+    }
+
+def delete_artifacts(paths: Iterable[Optional[str]]):
+    """Remove artifact files (legacy rows have no path)"""
+    for path in paths:
+        if path:
+            Path(path).unlink(missing_ok=True)
+
+def delete_project_artifacts(project_id: int):
+    """Remove every artifact file of a project"""
+    for kind in ARTIFACT_KINDS:
+        for path in _artifact_dir(kind).glob(f"project_{project_id}_*.parquet"):
+            path.unlink(missing_ok=True)
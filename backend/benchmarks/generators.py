@@ -0,0 +1,107 @@
+import pandas as pd
+import numpy as np
+from pathlib import Path
+from typing import Iterator, List
+import os
+import uuid
+
+from data_loader import ensure_columnar
+
+START_DATE = "2021-01-01"
+DAYS = 3 * 365  # date range of the generated rows
+CHUNK_ROWS = 1_000_000  # rows generated and written at once
+EXCEL_MAX_ROWS = 1_048_575  # worksheet rows minus the header
+
+FORMATS = ('csv', 'json', 'xlsx', 'parquet')
+MAIN_COLUMNS = {"date": "date", "product": "product", "value": "sales"}
+
+def product_names(products: int) -> np.ndarray:
+    return np.array([f"P{i:06d}" for i in range(products)], dtype=object)
+
+def _random_rows(rng: np.random.Generator, rows: int, products: int, days: int) -> dict:
+    """Dates and products drawn uniformly, so rows are neither sorted nor complete"""
+    start = np.datetime64(START_DATE, 'ns')
+    return {
+        "date": start + rng.integers(0, days, rows).astype('timedelta64[D]'),
+        "product": product_names(products)[rng.integers(0, products, rows)]
+    }
+
+def iter_main_chunks(rows: int, products: int, days: int = DAYS, seed: int = 0,
+                     chunk_rows: int = CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """Sales-like transactions: date, product and a positive value per row"""
+    for index, offset in enumerate(range(0, rows, chunk_rows)):
+        size = min(chunk_rows, rows - offset)
+        rng = np.random.default_rng([seed, index])
+        chunk = pd.DataFrame(_random_rows(rng, size, products, days))
+        chunk[MAIN_COLUMNS["value"]] = rng.gamma(2.0, 50.0, size).round(2)
+        yield chunk
+
+def additional_columns(count: int) -> List[str]:
+    return [f"x{i}" for i in range(1, count + 1)]
+
+def iter_additional_chunks(rows: int, products: int, value_columns: int = 3, days: int = DAYS,
+                           seed: int = 1, chunk_rows: int = CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """Driver-like readings (prices, weather, ...): date, product and value_columns numeric columns"""
+    for index, offset in enumerate(range(0, rows, chunk_rows)):
+        size = min(chunk_rows, rows - offset)
+        rng = np.random.default_rng([seed, index])
+        chunk = pd.DataFrame(_random_rows(rng, size, products, days))
+        for col in additional_columns(value_columns):
+            chunk[col] = rng.normal(100.0, 15.0, size).round(3)
+        yield chunk
+
+def source_path(data_dir, kind: str, rows: int, products: int, file_format: str, seed: int = 0) -> Path:
+    """
+    File holding the generated rows. The 'parquet' format uses the CSV file:
+    uploads are CSV, JSON or Excel and Parquet only exists as their columnar copy.
+    """
+    extension = 'csv' if file_format == 'parquet' else file_format
+    return Path(data_dir) / f"{kind}_{rows}_{products}_{seed}.{extension}"
+
+def write_chunks(chunks: Iterator[pd.DataFrame], path: Path, file_format: str):
+    """Write generated chunks one after another (Excel needs all rows at once)"""
+    if file_format == 'xlsx':
+        pd.concat(chunks, ignore_index=True).to_excel(path, index=False)
+        return
+
+    with open(path, "w", newline="") as f:
+        for index, chunk in enumerate(chunks):
+            if file_format in ('csv', 'parquet'):
+                chunk.to_csv(f, index=False, header=index == 0, date_format="%Y-%m-%d")
+            elif file_format == 'json':
+                f.write(chunk.to_json(orient='records', lines=True, date_format='iso'))
+                f.write("\n")
+            else:
+                raise ValueError(f"Unsupported format: {file_format}")
+
+def generate(data_dir, kind: str, rows: int, products: int, file_format: str,
+             seed: int = 0, value_columns: int = 3) -> Path:
+    """
+    Generate a main ('main') or additional ('additional') file unless it exists
+    already and return its path. For the 'parquet' format the columnar copy is
+    created as well. Excel files are limited to EXCEL_MAX_ROWS rows.
+    """
+    if file_format not in FORMATS:
+        raise ValueError(f"Unsupported format: {file_format}")
+    if file_format == 'xlsx' and rows > EXCEL_MAX_ROWS:
+        raise ValueError(f"Excel files hold at most {EXCEL_MAX_ROWS} rows")
+
+    path = source_path(data_dir, kind, rows, products, file_format, seed)
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if kind == 'main':
+            chunks = iter_main_chunks(rows, products, seed=seed)
+        else:
+            chunks = iter_additional_chunks(rows, products, value_columns, seed=seed + 1)
+
+        # Interrupted runs must not leave a truncated file to be reused
+        tmp_path = path.with_name(f"{path.stem}.{uuid.uuid4().hex}.tmp{path.suffix}")
+        try:
+            write_chunks(chunks, tmp_path, file_format)
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+    if file_format == 'parquet':
+        ensure_columnar(path)
+    return path
@@ -0,0 +1,353 @@
+"""
+Aggregation and ingest benchmarks on synthetic data.
+
+Run from the backend directory, e.g.
+
+    python -m benchmarks.run --rows 1M,10M --products 1,1000 --formats csv,parquet
+    python -m benchmarks.run --rows 1M --save-baseline
+    python -m benchmarks.run --rows 1M --baseline benchmarks/baseline.json
+
+Every combination of row count, product count and main file format runs:
+ingest (load_file), aggregate_to_period, fill_missing_dates,
+merge_dataframes_horizontal and the whole aggregate path (as run by an
+aggregation job, against a SQLite database in the data directory). Wall time
+and peak RSS are recorded for each; with --baseline the results are compared
+to a stored run and the exit status is 1 when one got slower (or used more
+memory) by more than --tolerance.
+"""
+import argparse
+import glob
+import json
+import platform
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from config import settings
+from benchmarks.generators import (
+    FORMATS, EXCEL_MAX_ROWS, MAIN_COLUMNS, additional_columns, generate
+)
+from data_loader import load_file, source_dtypes
+from jobs import Job
+from memory_budget import MemoryMonitor
+from models import Base, User, Project, AdditionalFile
+from routers.aggregation import (
+    aggregate_to_period, fill_missing_dates, merge_dataframes_horizontal, _aggregate
+)
+from schemas import AggregationConfig
+
+BENCHMARK_DIR = Path(__file__).parent
+DEFAULT_BASELINE = BENCHMARK_DIR / "baseline.json"
+DEFAULT_DATA_DIR = BENCHMARK_DIR / "data"
+TIME_NOISE_S = 0.05  # wall time differences below this are not reported as regressions
+MEMORY_NOISE_MB = 32  # nor are RSS differences below this
+
+def parse_count(value: str) -> int:
+    """'100k', '1M', '1_000_000' -> int"""
+    value = value.strip().lower().replace("_", "")
+    multiplier = {"k": 1_000, "m": 1_000_000}.get(value[-1:], 1)
+    if multiplier != 1:
+        value = value[:-1]
+    return int(float(value) * multiplier)
+
+def _reset_artifacts(file_path: Path):
+    """Drop the profile and columnar copy of a generated file so it is read cold"""
+    for artifact in file_path.parent.glob(f"{glob.escape(file_path.name)}.*"):
+        artifact.unlink(missing_ok=True)
+
+def measure(fn: Callable[[], Any], repeat: int = 1, setup: Callable[[], None] = None) -> Tuple[Any, Dict[str, float]]:
+    """Best wall time and highest peak RSS of repeat runs of fn"""
+    wall_times = []
+    peak_rss = peak_increase = 0.0
+    result = None
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        with MemoryMonitor() as monitor:
+            started = time.perf_counter()
+            result = fn()
+            wall_times.append(time.perf_counter() - started)
+        report = monitor.report()
+        peak_rss = max(peak_rss, report["peak_rss_mb"])
+        peak_increase = max(peak_increase, report["peak_increase_mb"])
+
+    return result, {
+        "wall_s": round(min(wall_times), 4),
+        "peak_rss_mb": peak_rss,
+        "peak_increase_mb": peak_increase
+    }
+
+def _with_gaps(df: pd.DataFrame, fraction: float, seed: int = 0) -> pd.DataFrame:
+    """Drop a random fraction of the rows so there are periods to fill"""
+    keep = np.random.default_rng(seed).random(len(df)) >= fraction
+    return df[keep].reset_index(drop=True)
+
+def _session_factory(data_dir: Path):
+    # Result records hold timestamps, which the JSON column cannot encode by itself
+    engine = create_engine(
+        f"sqlite:///{data_dir / 'benchmark.db'}",
+        json_serializer=lambda obj: json.dumps(obj, default=str)
+    )
+    # Scratch database: recreated so it always matches the models
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def _create_project(db, main_path: Path, additional_paths: List[Path], value_columns: List[str],
+                    aggregation: str) -> int:
+    user = db.query(User).filter(User.email == "benchmark@example.com").first()
+    if user is None:
+        user = User(email="benchmark@example.com", hashed_password="-")
+        db.add(user)
+        db.flush()
+
+    project = Project(
+        name=f"benchmark {main_path.name}",
+        user_id=user.id,
+        source_type="file",
+        file_path=str(main_path),
+        date_column=MAIN_COLUMNS["date"],
+        value_column=MAIN_COLUMNS["value"],
+        product_column=MAIN_COLUMNS["product"]
+    )
+    db.add(project)
+    db.flush()
+
+    for path in additional_paths:
+        db.add(AdditionalFile(
+            project_id=project.id,
+            file_name=path.name,
+            file_path=str(path),
+            file_type=path.suffix.lstrip('.'),
+            date_column=MAIN_COLUMNS["date"],
+            product_column=MAIN_COLUMNS["product"],
+            selected_columns=value_columns,
+            column_aggregations={col: aggregation for col in value_columns},
+            fill_method='forward'
+        ))
+    db.commit()
+    return project.id
+
+def run_scenario(args, rows: int, products: int, file_format: str, session_factory) -> List[Dict[str, Any]]:
+    """All benchmarks for one main file; returns one record per benchmark"""
+    date_column, product_column, value_column = (
+        MAIN_COLUMNS["date"], MAIN_COLUMNS["product"], MAIN_COLUMNS["value"]
+    )
+    value_columns = additional_columns(args.additional_columns)
+    additional_format = 'parquet' if file_format == 'parquet' else 'csv'
+
+    print(f"Generating {rows:,} rows x {products:,} products ({file_format})", file=sys.stderr)
+    main_path = generate(args.data_dir, 'main', rows, products, file_format, seed=args.seed)
+    additional_paths = [
+        generate(args.data_dir, 'additional', args.additional_rows, products, additional_format,
+                 seed=args.seed + index, value_columns=args.additional_columns)
+        for index in range(args.additional_files)
+    ]
+    # Only the text formats are read cold; 'parquet' measures the columnar copy
+    reset = (lambda: _reset_artifacts(main_path)) if file_format != 'parquet' else None
+
+    records = []
+    def record(name: str, metrics: Dict[str, float]):
+        records.append({
+            "benchmark": name,
+            "rows": rows,
+            "products": products,
+            "format": file_format,
+            **metrics
+        })
+        print(f"  {name:<28} {metrics['wall_s']:>10.3f}s {metrics['peak_rss_mb']:>10.1f} MB", file=sys.stderr)
+
+    main_dtypes = source_dtypes(value_columns=[value_column], categorical_columns=[product_column])
+    main_df, metrics = measure(
+        lambda: load_file(main_path, columns=[date_column, value_column, product_column],
+                          dtypes=main_dtypes, parse_dates=[date_column]),
+        args.repeat, reset
+    )
+    record("ingest", metrics)
+
+    main_agg, metrics = measure(
+        lambda: aggregate_to_period(main_df, date_column, args.period, {value_column: args.aggregation},
+                                    product_column),
+        args.repeat
+    )
+    record("aggregate_to_period", metrics)
+    del main_df
+
+    min_date = main_agg[date_column].min()
+    max_date = main_agg[date_column].max()
+    additional_dfs = []
+    for index, path in enumerate(additional_paths):
+        add_df = load_file(path, columns=[date_column, product_column] + value_columns,
+                           parse_dates=[date_column])
+        add_agg = aggregate_to_period(add_df, date_column, args.period,
+                                      {col: args.aggregation for col in value_columns}, product_column)
+        gappy = _with_gaps(add_agg, args.gap_fraction, seed=args.seed + index)
+        filled, metrics = measure(
+            lambda: fill_missing_dates(gappy, date_column, min_date, max_date, args.period,
+                                       'forward', product_column),
+            args.repeat
+        )
+        if index == 0:
+            record("fill_missing_dates", metrics)
+        additional_dfs.append({'df': filled, 'product_column': product_column})
+
+    if additional_dfs:
+        _, metrics = measure(
+            lambda: merge_dataframes_horizontal(main_agg, additional_dfs, date_column, product_column),
+            args.repeat
+        )
+        record("merge_dataframes_horizontal", metrics)
+    del main_agg, additional_dfs
+
+    def aggregate_project():
+        db = session_factory()
+        try:
+            project_id = _create_project(db, main_path, additional_paths, value_columns, args.aggregation)
+            config = AggregationConfig(
+                period=args.period,
+                main_value_aggregation=args.aggregation,
+                use_cache=False
+            )
+            return _aggregate(db, Job("aggregation", project_id), project_id, config)
+        finally:
+            db.close()
+
+    _, metrics = measure(aggregate_project, args.repeat, reset)
+    record("aggregate_pipeline", metrics)
+
+    return records
+
+def _record_key(record: Dict[str, Any]) -> tuple:
+    return (record["benchmark"], record["rows"], record["products"], record["format"])
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Print the change against the baseline and return the regressions found"""
+    previous = {_record_key(record): record for record in baseline.get("results", [])}
+    regressions = []
+
+    print(f"\n{'benchmark':<28} {'rows':>11} {'products':>9} {'format':<8}"
+          f"{'wall_s':>10} {'baseline':>10} {'change':>8} {'rss_mb':>9} {'baseline':>9}")
+    for record in results:
+        base = previous.get(_record_key(record))
+        line = (f"{record['benchmark']:<28} {record['rows']:>11,} {record['products']:>9,} {record['format']:<8}"
+                f"{record['wall_s']:>10.3f}")
+        if base is None:
+            print(f"{line} {'-':>10}")
+            continue
+
+        change = record["wall_s"] / base["wall_s"] - 1 if base["wall_s"] else 0.0
+        print(f"{line} {base['wall_s']:>10.3f} {change:>+8.0%}"
+              f" {record['peak_increase_mb']:>9.1f} {base['peak_increase_mb']:>9.1f}")
+
+        name = " / ".join(str(part) for part in _record_key(record))
+        if change > tolerance and record["wall_s"] - base["wall_s"] > TIME_NOISE_S:
+            regressions.append(f"{name}: {base['wall_s']:.3f}s -> {record['wall_s']:.3f}s")
+        memory_limit = max(base["peak_increase_mb"] * (1 + tolerance), base["peak_increase_mb"] + MEMORY_NOISE_MB)
+        if record["peak_increase_mb"] > memory_limit:
+            regressions.append(
+                f"{name}: {base['peak_increase_mb']:.1f} MB -> {record['peak_increase_mb']:.1f} MB peak increase"
+            )
+
+    return regressions
+
+def environment() -> Dict[str, Any]:
+    import pyarrow
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "pyarrow": pyarrow.__version__
+    }
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Aggregation and ingest benchmarks on synthetic data")
+    parser.add_argument("--rows", default="1M", help="main file sizes, e.g. 1M,10M,100M")
+    parser.add_argument("--products", default="1,1000", help="product cardinalities, e.g. 1,1000,100000")
+    parser.add_argument("--formats", default="csv,parquet", help=f"main file formats among {','.join(FORMATS)}")
+    parser.add_argument("--period", default="weekly", choices=["daily", "weekly", "monthly"])
+    parser.add_argument("--aggregation", default="sum", help="aggregation function of every value column")
+    parser.add_argument("--additional-files", type=int, default=2)
+    parser.add_argument("--additional-rows", type=parse_count, default=parse_count("100k"))
+    parser.add_argument("--additional-columns", type=int, default=3)
+    parser.add_argument("--gap-fraction", type=float, default=0.2,
+                        help="share of aggregated additional rows dropped before fill_missing_dates")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per benchmark (best wall time is kept)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", type=Path, default=DEFAULT_DATA_DIR,
+                        help="generated files, reused across runs")
+    parser.add_argument("--output", type=Path, help="write the results to this JSON file")
+    parser.add_argument("--baseline", type=Path, help="compare against this results file")
+    parser.add_argument("--save-baseline", nargs="?", type=Path, const=DEFAULT_BASELINE,
+                        help=f"store the results as the baseline (default {DEFAULT_BASELINE})")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed slowdown / memory growth against the baseline (0.2 = 20%%)")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    sizes = [parse_count(value) for value in args.rows.split(",")]
+    cardinalities = [parse_count(value) for value in args.products.split(",")]
+    formats = [value.strip() for value in args.formats.split(",")]
+    unknown = set(formats) - set(FORMATS)
+    if unknown:
+        print(f"Unknown formats: {', '.join(sorted(unknown))}", file=sys.stderr)
+        return 2
+
+    args.data_dir.mkdir(parents=True, exist_ok=True)
+    session_factory = _session_factory(args.data_dir)
+    # Results of the pipeline runs stay with the generated data
+    settings.ARTIFACTS_DIR = str(args.data_dir / "artifacts")
+
+    results = []
+    for rows in sizes:
+        for products in cardinalities:
+            for file_format in formats:
+                if file_format == 'xlsx' and rows > EXCEL_MAX_ROWS:
+                    print(f"Skipping xlsx with {rows:,} rows (at most {EXCEL_MAX_ROWS:,})", file=sys.stderr)
+                    continue
+                results.extend(run_scenario(args, rows, products, file_format, session_factory))
+
+    run = {
+        "created_at": datetime.utcnow().isoformat(),
+        "environment": environment(),
+        "settings": {
+            key: value for key, value in vars(args).items()
+            if key not in ("data_dir", "output", "baseline", "save_baseline")
+        },
+        "results": results
+    }
+    for path in (args.output, args.save_baseline):
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, "w") as f:
+                json.dump(run, f, indent=2)
+
+    if args.baseline is None:
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get("environment") != run["environment"]:
+        print("\nNote: the baseline was recorded in a different environment", file=sys.stderr)
+
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+
+    print("\nNo regressions")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+import pandas as pd
+import numpy as np
+from functools import lru_cache
+from typing import Iterable, Optional, Tuple
+
+from config import settings
+
+# Calendar column holding the period key of each period
+PERIOD_KEYS = {
+    'daily': 'day',
+    'weekly': 'week',
+    'monthly': 'month_key',
+    'quarterly': 'quarter_key',
+    'fiscal_quarterly': 'fiscal_quarter_key',
+    'fiscal_yearly': 'fiscal_year'
+}
+HOLIDAY_KINDS = ('governmental', 'religious')
+NAT_DAY = np.datetime64('NaT', 'D').astype(np.int64)
+
+def _holiday_mask(days: np.ndarray, month: np.ndarray, day_of_month: np.ndarray,
+                  holidays: Iterable[str]) -> np.ndarray:
+    """Days that are holidays: 'MM-DD' entries recur every year, 'YYYY-MM-DD' entries happen once"""
+    mask = np.zeros(len(days), dtype=bool)
+    for holiday in holidays:
+        parts = holiday.strip().split("-")
+        if len(parts) == 2:
+            mask |= (month == int(parts[0])) & (day_of_month == int(parts[1]))
+        elif len(parts) == 3:
+            mask |= days == np.datetime64(holiday.strip(), 'D')
+        else:
+            raise ValueError(f"Invalid holiday date: {holiday}")
+    return mask
+
+@lru_cache(maxsize=8)
+def _build_calendar(start_year: int, end_year: int, fiscal_start_month: int,
+                    governmental: Tuple[str, ...], religious: Tuple[str, ...]) -> pd.DataFrame:
+    days = np.arange(
+        np.datetime64(f"{start_year:04d}-01-01"), np.datetime64(f"{end_year + 1:04d}-01-01"),
+        dtype='datetime64[D]'
+    )
+    day = days.astype(np.int64)
+    month_key = days.astype('datetime64[M]').astype(np.int64)
+    year = (month_key // 12 + 1970).astype(np.int32)
+    month = (month_key % 12 + 1).astype(np.int32)
+    quarter = ((month - 1) // 3 + 1).astype(np.int32)
+    day_of_month = (days - days.astype('datetime64[M]')).astype(np.int64) + 1
+
+    # Fiscal years are named after the calendar year they end in
+    fiscal_offset = fiscal_start_month - 1
+    fiscal_year = (year + (month > fiscal_offset)).astype(np.int32) if fiscal_offset else year
+
+    return pd.DataFrame({
+        "date": days.astype('datetime64[ns]'),
+        "day": day,
+        # 1970-01-01 is a Thursday: shift so that Monday..Sunday share a key
+        "week": (day + 3) // 7,
+        "month_key": month_key,
+        "quarter_key": month_key // 3,
+        "fiscal_quarter_key": (month_key - fiscal_offset) // 3,
+        "year": year,
+        "month": month,
+        "quarter": quarter,
+        "fiscal_year": fiscal_year,
+        "fiscal_quarter": ((month - 1 - fiscal_offset) % 12 // 3 + 1).astype(np.int32),
+        "month_sin": np.sin(2 * np.pi * month / 12),
+        "month_cos": np.cos(2 * np.pi * month / 12),
+        "quarter_sin": np.sin(2 * np.pi * quarter / 4),
+        "quarter_cos": np.cos(2 * np.pi * quarter / 4),
+        "holiday_governmental": _holiday_mask(days, month, day_of_month, governmental).astype(np.int8),
+        "holiday_religious": _holiday_mask(days, month, day_of_month, religious).astype(np.int8)
+    })
+
+def calendar_table(start_year: int = None, end_year: int = None) -> pd.DataFrame:
+    """
+    One row per day from CALENDAR_START_YEAR to CALENDAR_END_YEAR with the
+    period keys (day, week, month, quarter and fiscal quarter / year numbers),
+    month / quarter numbers with their sine and cosine, and holiday flags.
+    Built once per range and settings, then shared; callers must not modify it.
+    """
+    return _build_calendar(
+        start_year if start_year is not None else settings.CALENDAR_START_YEAR,
+        end_year if end_year is not None else settings.CALENDAR_END_YEAR,
+        settings.FISCAL_YEAR_START_MONTH,
+        tuple(settings.GOVERNMENTAL_HOLIDAYS),
+        tuple(settings.RELIGIOUS_HOLIDAYS)
+    )
+
+def _year_of(day: int) -> int:
+    return int(np.datetime64(int(day), 'D').astype('datetime64[Y]').astype(np.int64)) + 1970
+
+def _positions(dates) -> Tuple[pd.DataFrame, np.ndarray, Optional[np.ndarray]]:
+    """
+    Calendar covering the dates, the row of each date in it and a mask of the
+    dates that are not NaT (None when all of them are set).
+    """
+    days = dates.to_numpy(dtype='datetime64[ns]').astype('datetime64[D]').astype(np.int64)
+    table = calendar_table()
+    if len(days) == 0:
+        return table, days, None
+
+    # NaT is the smallest int64, so the minimum tells whether there are any
+    valid = None
+    first, last = days.min(), days.max()
+    if first == NAT_DAY:
+        valid = days != NAT_DAY
+        if not valid.any():
+            return table, np.zeros(len(days), dtype=np.int64), valid
+        first = days[valid].min()
+
+    if first < table["day"].iat[0] or last > table["day"].iat[-1]:
+        # Dates beyond the configured range: a wider calendar, cached as well
+        table = calendar_table(
+            min(_year_of(first), settings.CALENDAR_START_YEAR),
+            max(_year_of(last), settings.CALENDAR_END_YEAR)
+        )
+
+    positions = np.subtract(days, table["day"].iat[0], out=days)
+    if valid is not None:
+        positions[~valid] = 0
+    return table, positions, valid
+
+def calendar_lookup(dates, column: str) -> np.ndarray:
+    """
+    Calendar values of column for each date, gathered by day number. NaT dates
+    get NaN, or an arbitrary value for integer columns (callers drop them first).
+    """
+    table, positions, valid = _positions(dates)
+    values = table[column].to_numpy()[positions]
+    if valid is not None and values.dtype.kind == 'f':
+        values[~valid] = np.nan
+    return values
+
+def period_keys(dates, period: str) -> np.ndarray:
+    """Key of the period ('daily', 'weekly', 'monthly', 'quarterly', ...) each date falls into"""
+    return calendar_lookup(dates, PERIOD_KEYS[period])
+
+def _holiday_counts(table: pd.DataFrame, period: str, kind: str) -> Tuple[np.ndarray, int]:
+    """Number of holidays of each period in the table, indexed by period key minus the first key"""
+    keys = table[PERIOD_KEYS[period]].to_numpy()
+    counts = np.bincount(keys - keys[0], weights=table[f"holiday_{kind}"].to_numpy())
+    return counts.astype(np.int64), keys[0]
+
+def holidays_in_period(dates, period: str, kind: str) -> np.ndarray:
+    """Number of holidays of the kind ('governmental' or 'religious') in each date's period"""
+    table, positions, _ = _positions(dates)
+    counts, first_key = _holiday_counts(table, period, kind)
+    return counts[table[PERIOD_KEYS[period]].to_numpy()[positions] - first_key]
+
+def periods_until_holiday(dates, period: str, kind: str) -> np.ndarray:
+    """
+    Number of periods from each date's period to the next one with a holiday of
+    the kind (0 when its own period has one, or when no later holiday is known)
+    """
+    table, positions, _ = _positions(dates)
+    counts, first_key = _holiday_counts(table, period, kind)
+    keys = table[PERIOD_KEYS[period]].to_numpy()[positions] - first_key
+
+    holiday_keys = np.flatnonzero(counts)
+    if len(holiday_keys) == 0:
+        return np.zeros(len(keys), dtype=np.int64)
+    next_index = np.searchsorted(holiday_keys, keys)
+    known = next_index < len(holiday_keys)
+    distance = holiday_keys[np.minimum(next_index, len(holiday_keys) - 1)] - keys
+    return np.where(known, distance, 0)
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import List, Optional
 
 class Settings(BaseSettings):
     # Database
@@ -17,6 +17,60 @@ class Settings(BaseSettings):
     # File Upload
     UPLOAD_DIR: str = "uploads"
     MAX_FILE_SIZE: int = 100 * 1024 * 1024  # 100MB
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024  # 1MB read/write chunks when streaming uploads
+    UPLOAD_UNREFERENCED_TTL: int = 24 * 3600  # seconds an upload used by no project is kept
+
+    # File profiling (upload / preview responses)
+    PROFILE_INFER_ROWS: int = 1000  # rows parsed to infer dtypes
+    PROFILE_SAMPLE_ROWS: int = 10  # sample rows kept in the cached profile
+    PROFILE_SCAN_BLOCK_SIZE: int = 64 * 1024 * 1024  # 64MB blocks when counting rows
+    
+    # User database connections (pooled engine registry)
+    EXTERNAL_DB_MAX_ENGINES: int = 32  # cached engines, least recently used are disposed first
+    EXTERNAL_DB_IDLE_TIMEOUT: int = 600  # seconds before an unused engine is disposed
+    EXTERNAL_DB_POOL_SIZE: int = 2
+    EXTERNAL_DB_MAX_OVERFLOW: int = 3
+    EXTERNAL_DB_POOL_RECYCLE: int = 1800  # seconds
+    EXTERNAL_DB_CONNECT_TIMEOUT: int = 10  # seconds
+    EXTERNAL_DB_STATEMENT_TIMEOUT_MS: int = 5 * 60 * 1000  # 5 minutes
+    EXTERNAL_DB_FETCH_SIZE: int = 50000  # rows per server-side cursor fetch when streaming
+    EXTERNAL_DB_METADATA_TTL: int = 300  # seconds table lists, columns and exact counts are cached
+    EXTERNAL_DB_COUNT_WORKERS: int = 2  # background threads for exact row counts
+    
+    # Aggregation
+    AGGREGATION_USE_FLOAT32: bool = False  # load value columns as float32 instead of float64
+    AGGREGATION_STREAMING_THRESHOLD: int = 64 * 1024 * 1024  # files above 64MB are aggregated in chunks (below MAX_FILE_SIZE)
+    AGGREGATION_CHUNK_ROWS: int = 1_000_000  # rows per chunk in chunked aggregation
+    COLUMNAR_CSV_BLOCK_SIZE: int = 64 * 1024 * 1024  # CSV block size when converting large files to Parquet
+    AGGREGATION_MAX_WORKERS: int = 4  # additional files loaded and aggregated concurrently
+    CHECKPOINT_DIR: str = "checkpoints"  # partial aggregates kept for incremental re-aggregation
+    
+    # Stored results (aggregated data and generated features)
+    ARTIFACTS_DIR: str = "artifacts"  # Parquet files referenced from the result rows
+    ARTIFACT_COMPRESSION: str = "zstd"
+    ARTIFACT_ROW_GROUP_SIZE: int = 64 * 1024  # rows per row group
+    ARTIFACT_PAGE_MAX_ROWS: int = 10000  # largest page served by the rows endpoints
+    
+    # Memory budget (aggregation and feature generation)
+    MEMORY_BUDGET_MB: Optional[int] = None  # default budget; when set, frames are downcast to save memory
+    MEMORY_SAMPLE_INTERVAL: float = 0.05  # seconds between RSS samples for peak memory reports
+    CATEGORICAL_MAX_UNIQUE_RATIO: float = 0.5  # text columns with fewer distinct values become categoricals
+    
+    # Export of stored results to database tables (COPY)
+    EXPORT_TABLE_PREFIX: str = "_gf"  # tables are named <prefix>_project_<id>_<aggregated|features>
+    EXPORT_COPY_BATCH_ROWS: int = 100_000  # rows sent per COPY
+    
+    # Calendar table (period keys and date features)
+    CALENDAR_START_YEAR: int = 1970
+    CALENDAR_END_YEAR: int = 2100  # dates outside the range get a wider table built on demand
+    FISCAL_YEAR_START_MONTH: int = 1  # 1 = fiscal year is the calendar year
+    GOVERNMENTAL_HOLIDAYS: List[str] = []  # 'MM-DD' (every year) or 'YYYY-MM-DD' (once)
+    RELIGIOUS_HOLIDAYS: List[str] = []  # same format; lunar holidays need one entry per year
+    
+    # Background jobs
+    JOB_MAX_WORKERS: int = 2  # jobs (e.g. aggregations) running at the same time
+    JOB_HISTORY_SIZE: int = 200  # finished jobs kept in memory for status polling
+    JOB_WAIT_TIMEOUT: int = 300  # seconds synchronous endpoints wait before returning the job to poll
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,365 @@
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+from sqlalchemy import select, column, table, text
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+import io
+import os
+import uuid
+
+from config import settings
+from file_profiler import file_type_from_path, profile_file, is_json_lines
+
+COLUMNAR_SUFFIX = ".parquet"
+
+def columnar_path(file_path) -> Path:
+    """Location of the Parquet copy stored next to the upload"""
+    file_path = Path(file_path)
+    return file_path.with_name(file_path.name + COLUMNAR_SUFFIX)
+
+def source_dtypes(value_columns: List[str] = None, categorical_columns: List[str] = None,
+                  float32: bool = None) -> Dict[str, str]:
+    """
+    Build the dtype mapping used when loading source columns.
+    Value columns become float32 when enabled (AGGREGATION_USE_FLOAT32 by default)
+    and keep their source dtype otherwise; categorical columns (e.g. product)
+    become 'category'.
+    """
+    if float32 is None:
+        float32 = settings.AGGREGATION_USE_FLOAT32
+
+    dtypes = {}
+    if float32:
+        for col in value_columns or []:
+            dtypes[col] = 'float32'
+    for col in categorical_columns or []:
+        dtypes[col] = 'category'
+    return dtypes
+
+def ensure_datetime(values: pd.Series, date_format: str = None) -> pd.Series:
+    """
+    Return values as datetime64, parsing only when they are not typed yet.
+    A known format (e.g. detected at upload) avoids per-element format inference.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    return pd.to_datetime(values, format=date_format)
+
+def apply_dtypes(df: pd.DataFrame, dtypes: Dict[str, str] = None, parse_dates: List[str] = None,
+                 date_formats: Dict[str, str] = None) -> pd.DataFrame:
+    """Cast columns to the requested dtypes and parse date columns (in place)"""
+    for col, dtype in (dtypes or {}).items():
+        if col in df.columns and df[col].dtype != dtype:
+            df[col] = df[col].astype(dtype)
+
+    for col in parse_dates or []:
+        if col in df.columns and not pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = ensure_datetime(df[col], (date_formats or {}).get(col))
+
+    return df
+
+def read_source_file(file_path, file_type: str = None, columns: Optional[List[str]] = None,
+                     dtypes: Dict[str, str] = None) -> pd.DataFrame:
+    """Parse the original upload (CSV, JSON or Excel)"""
+    file_type = file_type or file_type_from_path(file_path)
+
+    if file_type == 'csv':
+        return pd.read_csv(file_path, usecols=columns, dtype=dtypes)
+    elif file_type == 'json':
+        df = pd.read_json(file_path, lines=is_json_lines(file_path))
+        return df[columns] if columns is not None else df
+    elif file_type in ['xlsx', 'xls']:
+        return pd.read_excel(file_path, usecols=columns, dtype=dtypes)
+
+    raise ValueError(f"Unsupported file type: {file_type}")
+
+def _normalize_schema(arrow_table: pa.Table) -> pa.Table:
+    """Store dates and timestamps as timestamp[ns] so pandas gets datetime64[ns] columns back"""
+    fields = []
+    for field in arrow_table.schema:
+        if pa.types.is_date(field.type):
+            field = field.with_type(pa.timestamp('ns'))
+        elif pa.types.is_timestamp(field.type) and field.type.unit != 'ns':
+            field = field.with_type(pa.timestamp('ns', tz=field.type.tz))
+        fields.append(field)
+
+    schema = pa.schema(fields, metadata=arrow_table.schema.metadata)
+    return arrow_table if schema.equals(arrow_table.schema) else arrow_table.cast(schema)
+
+def _parse_date_columns(arrow_table: pa.Table, date_formats: Dict[str, str]) -> pa.Table:
+    """Store text columns with a detected datetime format as timestamps"""
+    for col, date_format in date_formats.items():
+        if col not in arrow_table.column_names:
+            continue
+        index = arrow_table.column_names.index(col)
+        field_type = arrow_table.schema.field(index).type
+        if not (pa.types.is_string(field_type) or pa.types.is_large_string(field_type)):
+            continue
+        try:
+            parsed = pd.to_datetime(arrow_table.column(index).to_pandas(), format=date_format)
+        except (ValueError, TypeError):
+            continue  # the format of the sample does not hold for the whole column
+        arrow_table = arrow_table.set_column(index, col, pa.array(parsed))
+    return arrow_table
+
+def _read_as_table(file_path: Path, file_type: str, date_formats: Dict[str, str]) -> pa.Table:
+    if file_type == 'csv':
+        arrow_table = pa_csv.read_csv(file_path)
+    else:
+        arrow_table = pa.Table.from_pandas(read_source_file(file_path, file_type), preserve_index=False)
+    return _normalize_schema(_parse_date_columns(arrow_table, date_formats))
+
+def _write_tables(tables: Iterator[pa.Table], tmp_path: Path, date_formats: Dict[str, str]) -> bool:
+    """
+    Write tables one by one to a Parquet file, cast to the schema of the first
+    one; returns False when there was none
+    """
+    writer = None
+    try:
+        for arrow_table in tables:
+            arrow_table = _normalize_schema(_parse_date_columns(arrow_table, date_formats))
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_path, arrow_table.schema)
+            elif not arrow_table.schema.equals(writer.schema):
+                arrow_table = arrow_table.cast(writer.schema)
+            writer.write_table(arrow_table)
+    finally:
+        if writer is not None:
+            writer.close()
+    return writer is not None
+
+def _write_csv_streaming(file_path: Path, tmp_path: Path, date_formats: Dict[str, str]):
+    """Convert a large CSV block by block so memory stays bounded by COLUMNAR_CSV_BLOCK_SIZE"""
+    reader = pa_csv.open_csv(file_path, read_options=pa_csv.ReadOptions(block_size=settings.COLUMNAR_CSV_BLOCK_SIZE))
+    tables = (pa.Table.from_batches([batch]) for batch in reader)
+    if not _write_tables(tables, tmp_path, date_formats):
+        # Header only
+        pq.write_table(_normalize_schema(reader.schema.empty_table()), tmp_path)
+
+def _write_json_lines_streaming(file_path: Path, tmp_path: Path, date_formats: Dict[str, str]):
+    """
+    Convert a large JSON lines file AGGREGATION_CHUNK_ROWS rows at a time. A
+    column whose type changes between chunks (e.g. integers, then nulls) fails
+    the conversion, and the file is then read as text chunks instead.
+    """
+    with pd.read_json(file_path, lines=True, chunksize=settings.AGGREGATION_CHUNK_ROWS) as chunks:
+        tables = (pa.Table.from_pandas(chunk, preserve_index=False) for chunk in chunks)
+        if not _write_tables(tables, tmp_path, date_formats):
+            raise ValueError("JSON lines file without rows")
+
+def _columnar_failed_path(cache_path: Path) -> Path:
+    return cache_path.with_name(cache_path.name + ".failed")
+
+def is_large_file(file_path) -> bool:
+    """Whether a file is above AGGREGATION_STREAMING_THRESHOLD and should be processed in chunks"""
+    return Path(file_path).stat().st_size > settings.AGGREGATION_STREAMING_THRESHOLD
+
+def ensure_columnar(file_path, file_type: str = None) -> Optional[Path]:
+    """
+    Convert an upload to a typed Parquet file once and return its path.
+
+    Large CSV and JSON lines files are converted chunk by chunk, other files are
+    parsed at once. The conversion is skipped while an up-to-date copy exists. Returns None when
+    the file cannot be represented as Parquet (e.g. columns with mixed types),
+    in which case callers read the original file.
+    """
+    file_path = Path(file_path)
+    file_type = file_type or file_type_from_path(file_path)
+    cache_path = columnar_path(file_path)
+
+    source_mtime = file_path.stat().st_mtime_ns
+    if cache_path.exists() and cache_path.stat().st_mtime_ns >= source_mtime:
+        return cache_path
+
+    # Do not retry a conversion that already failed for this version of the file
+    failed_path = _columnar_failed_path(cache_path)
+    if failed_path.exists() and failed_path.stat().st_mtime_ns >= source_mtime:
+        return None
+
+    # Write to a unique temporary file so concurrent conversions do not clash
+    tmp_path = cache_path.with_name(f"{cache_path.name}.{uuid.uuid4().hex}.tmp")
+    date_formats = profile_file(file_path, file_type)["date_formats"]
+    try:
+        if file_type == 'csv' and is_large_file(file_path):
+            _write_csv_streaming(file_path, tmp_path, date_formats)
+        elif file_type == 'json' and is_large_file(file_path) and is_json_lines(file_path):
+            _write_json_lines_streaming(file_path, tmp_path, date_formats)
+        else:
+            pq.write_table(_read_as_table(file_path, file_type, date_formats), tmp_path)
+        os.replace(tmp_path, cache_path)
+    except (pa.ArrowException, ValueError, TypeError):
+        tmp_path.unlink(missing_ok=True)
+        failed_path.touch()
+        return None
+
+    return cache_path
+
+def load_file(file_path, file_type: str = None, columns: Optional[List[str]] = None,
+              dtypes: Dict[str, str] = None, parse_dates: List[str] = None) -> pd.DataFrame:
+    """
+    Load an uploaded file, optionally only the given columns.
+
+    Reads from the Parquet copy (created on first use) so the original text
+    file is parsed only once; falls back to parsing the original file.
+    dtypes and parse_dates are applied while loading (see apply_dtypes). Date
+    columns are usually typed in the Parquet copy already; otherwise they are
+    parsed with the format detected when the upload was profiled.
+    """
+    file_type = file_type or file_type_from_path(file_path)
+
+    cache_path = ensure_columnar(file_path, file_type)
+    if cache_path is not None:
+        df = pd.read_parquet(cache_path, columns=columns)
+    else:
+        df = read_source_file(file_path, file_type, columns, dtypes)
+
+    date_formats = None
+    if any(col in df.columns and not pd.api.types.is_datetime64_any_dtype(df[col]) for col in parse_dates or []):
+        date_formats = profile_file(file_path, file_type)["date_formats"]
+
+    return apply_dtypes(df, dtypes, parse_dates, date_formats)
+
+def iter_file_chunks(file_path, file_type: str = None, columns: Optional[List[str]] = None,
+                     dtypes: Dict[str, str] = None, parse_dates: List[str] = None,
+                     chunk_size: int = None) -> Iterator[pd.DataFrame]:
+    """
+    Read an uploaded file in chunks of chunk_size rows (AGGREGATION_CHUNK_ROWS by
+    default), from the Parquet copy's record batches when available, otherwise
+    from the CSV / JSON lines text. Excel and JSON array files cannot be read
+    partially and come as a single chunk.
+    """
+    file_type = file_type or file_type_from_path(file_path)
+    chunk_size = chunk_size or settings.AGGREGATION_CHUNK_ROWS
+    date_formats = profile_file(file_path, file_type)["date_formats"]
+
+    cache_path = ensure_columnar(file_path, file_type)
+    if cache_path is not None:
+        parquet_file = pq.ParquetFile(cache_path)
+        chunks = (
+            batch.to_pandas()
+            for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns)
+        )
+    elif file_type == 'csv':
+        chunks = pd.read_csv(file_path, usecols=columns, dtype=dtypes, chunksize=chunk_size)
+    elif file_type == 'json' and is_json_lines(file_path):
+        chunks = pd.read_json(file_path, lines=True, chunksize=chunk_size)
+    else:
+        chunks = [read_source_file(file_path, file_type, columns, dtypes)]
+
+    for chunk in chunks:
+        if columns is not None:
+            chunk = chunk[columns]
+        yield apply_dtypes(chunk, dtypes, parse_dates, date_formats)
+
+class _ByteRange(io.RawIOBase):
+    """Read-only view of the bytes [start, end) of a binary file"""
+
+    def __init__(self, f, start: int, end: int):
+        self._f = f
+        self._f.seek(start)
+        self._remaining = end - start
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        size = min(len(buffer), self._remaining)
+        if size <= 0:
+            return 0
+        data = self._f.read(size)
+        buffer[:len(data)] = data
+        self._remaining -= len(data)
+        return len(data)
+
+def complete_lines_end(file_path) -> int:
+    """Byte offset just past the last newline, so a line still being appended is not read"""
+    with open(file_path, "rb") as f:
+        position = f.seek(0, os.SEEK_END)
+        block_size = 64 * 1024
+        while position > 0:
+            start = max(position - block_size, 0)
+            f.seek(start)
+            block = f.read(position - start)
+            newline = block.rfind(b"\n")
+            if newline != -1:
+                return start + newline + 1
+            position = start
+    return 0
+
+def iter_text_chunks(file_path, file_type: str = None, start: int = 0, end: int = None,
+                     columns: Optional[List[str]] = None, dtypes: Dict[str, str] = None,
+                     parse_dates: List[str] = None, chunk_size: int = None) -> Iterator[pd.DataFrame]:
+    """
+    Read the rows stored in bytes [start, end) of a CSV or JSON lines file in chunks.
+    start must be at a line boundary; past the CSV header the column names come
+    from the file profile. Used to read only the rows appended since a previous pass.
+    """
+    file_type = file_type or file_type_from_path(file_path)
+    chunk_size = chunk_size or settings.AGGREGATION_CHUNK_ROWS
+    profile = profile_file(file_path, file_type)
+    end = complete_lines_end(file_path) if end is None else end
+    if end <= start:
+        return
+
+    with open(file_path, "rb") as f:
+        source = io.BufferedReader(_ByteRange(f, start, end))
+        if file_type == 'csv':
+            header = {'header': 0} if start == 0 else {'header': None, 'names': profile["columns"]}
+            chunks = pd.read_csv(source, usecols=columns, dtype=dtypes, chunksize=chunk_size, **header)
+        elif file_type == 'json':
+            chunks = pd.read_json(source, lines=True, chunksize=chunk_size)
+        else:
+            raise ValueError(f"Cannot read a byte range of a {file_type} file")
+
+        for chunk in chunks:
+            if columns is not None:
+                chunk = chunk[columns]
+            yield apply_dtypes(chunk, dtypes, parse_dates, profile["date_formats"])
+
+def build_source_query(table_name: str = None, query: str = None, columns: Optional[List[str]] = None,
+                       date_column: str = None, date_from=None):
+    """
+    Build a SELECT over a table or a user query, projecting only the given columns
+    (and keeping only rows with date_column >= date_from when given).
+    Identifiers are quoted by SQLAlchemy.
+    """
+    if query:
+        source = text(f"({query}) AS src")
+    else:
+        schema, _, name = table_name.rpartition('.')
+        source = table(name, schema=schema or None)
+
+    if columns:
+        sql = select(*[column(col) for col in columns]).select_from(source)
+    else:
+        sql = select(text("*")).select_from(source)
+
+    if date_from is not None:
+        sql = sql.where(column(date_column) >= date_from)
+    return sql
+
+def load_query(con, table_name: str = None, query: str = None, columns: Optional[List[str]] = None,
+               dtypes: Dict[str, str] = None, parse_dates: List[str] = None) -> pd.DataFrame:
+    """Load only the given columns from a database table or query"""
+    sql = build_source_query(table_name, query, columns)
+    df = pd.read_sql(sql, con, parse_dates=parse_dates)
+    return apply_dtypes(df, dtypes, parse_dates)
+
+def iter_query_chunks(engine, table_name: str = None, query: str = None, columns: Optional[List[str]] = None,
+                      dtypes: Dict[str, str] = None, parse_dates: List[str] = None,
+                      chunk_size: int = None, date_column: str = None, date_from=None) -> Iterator[pd.DataFrame]:
+    """
+    Stream a database table or query in chunks of chunk_size rows
+    (EXTERNAL_DB_FETCH_SIZE by default) through a server-side cursor,
+    so the result set is never materialized client-side at once.
+    With date_from, only rows with date_column >= date_from are read.
+    """
+    chunk_size = chunk_size or settings.EXTERNAL_DB_FETCH_SIZE
+    sql = build_source_query(table_name, query, columns, date_column, date_from)
+
+    with engine.connect() as conn:
+        conn = conn.execution_options(stream_results=True, max_row_buffer=chunk_size)
+        for chunk in pd.read_sql(sql, conn, parse_dates=parse_dates, chunksize=chunk_size):
+            yield apply_dtypes(chunk, dtypes, parse_dates)
@@ -0,0 +1,130 @@
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine, URL
+from sqlalchemy.pool import NullPool
+from collections import OrderedDict
+import threading
+import time
+
+from config import settings
+
+def connection_url(connection) -> URL:
+    """Build the URL for a user database connection (saved model or test schema)"""
+    return URL.create(
+        "postgresql",
+        username=connection.username,
+        password=connection.password,
+        host=connection.host,
+        port=connection.port,
+        database=connection.database
+    )
+
+def create_external_engine(connection, pooled: bool = True) -> Engine:
+    """
+    Create an engine for a user database with pre-ping and a statement timeout.
+    Unpooled engines are meant for one-off checks and should be disposed by the caller.
+    """
+    options = {
+        "pool_pre_ping": True,
+        "connect_args": {
+            "connect_timeout": settings.EXTERNAL_DB_CONNECT_TIMEOUT,
+            "options": f"-c statement_timeout={settings.EXTERNAL_DB_STATEMENT_TIMEOUT_MS}"
+        }
+    }
+    if pooled:
+        options.update(
+            pool_size=settings.EXTERNAL_DB_POOL_SIZE,
+            max_overflow=settings.EXTERNAL_DB_MAX_OVERFLOW,
+            pool_recycle=settings.EXTERNAL_DB_POOL_RECYCLE
+        )
+    else:
+        options["poolclass"] = NullPool
+
+    return create_engine(connection_url(connection), **options)
+
+def check_connection(connection):
+    """Run SELECT 1 over a one-off unpooled engine, raising on failure"""
+    engine = create_external_engine(connection, pooled=False)
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1")).fetchone()
+    finally:
+        engine.dispose()
+
+class _RegistryEntry:
+    def __init__(self, engine: Engine, fingerprint: str):
+        self.engine = engine
+        self.fingerprint = fingerprint
+        self.last_used = time.monotonic()
+
+class EngineRegistry:
+    """
+    Process-wide cache of pooled engines for user databases, keyed by DatabaseConnection.id.
+
+    Engines are reused across requests and disposed when they have been idle for
+    EXTERNAL_DB_IDLE_TIMEOUT seconds, when more than EXTERNAL_DB_MAX_ENGINES are
+    cached (least recently used first), or when the connection settings change.
+    """
+
+    def __init__(self, max_engines: int, idle_timeout: float):
+        self.max_engines = max_engines
+        self.idle_timeout = idle_timeout
+        self._entries: "OrderedDict[int, _RegistryEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, connection) -> Engine:
+        """Return the pooled engine for a saved DatabaseConnection, creating it if needed"""
+        fingerprint = connection_url(connection).render_as_string(hide_password=False)
+        stale = []
+
+        with self._lock:
+            entry = self._entries.get(connection.id)
+            if entry is not None and entry.fingerprint != fingerprint:
+                stale.append(self._entries.pop(connection.id).engine)
+                entry = None
+
+            if entry is None:
+                entry = _RegistryEntry(create_external_engine(connection), fingerprint)
+                self._entries[connection.id] = entry
+
+            entry.last_used = time.monotonic()
+            self._entries.move_to_end(connection.id)
+            stale.extend(self._evict())
+
+        for engine in stale:
+            engine.dispose()
+
+        return entry.engine
+
+    def dispose(self, connection_id: int):
+        """Drop and dispose the engine of a connection"""
+        with self._lock:
+            entry = self._entries.pop(connection_id, None)
+        if entry is not None:
+            entry.engine.dispose()
+
+    def dispose_all(self):
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+        for entry in entries:
+            entry.engine.dispose()
+
+    def _evict(self):
+        """Remove idle and least recently used entries (caller holds the lock)"""
+        evicted = []
+        now = time.monotonic()
+
+        for connection_id in list(self._entries):
+            if now - self._entries[connection_id].last_used > self.idle_timeout:
+                evicted.append(self._entries.pop(connection_id).engine)
+
+        while len(self._entries) > self.max_engines:
+            _, entry = self._entries.popitem(last=False)
+            evicted.append(entry.engine)
+
+        return evicted
+
+engine_registry = EngineRegistry(
+    max_engines=settings.EXTERNAL_DB_MAX_ENGINES,
+    idle_timeout=settings.EXTERNAL_DB_IDLE_TIMEOUT
+)
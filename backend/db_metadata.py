@@ -0,0 +1,126 @@
+from sqlalchemy import select, func, table, text
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import threading
+import time
+
+from config import settings
+from db_engines import engine_registry
+
+class TTLCache:
+    """Thread-safe dict whose entries expire after ttl seconds"""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: Dict[Any, tuple] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, stored_at = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+
+metadata_cache = TTLCache(settings.EXTERNAL_DB_METADATA_TTL)
+
+# Exact COUNT(*) results, computed in the background on request
+_exact_counts = TTLCache(settings.EXTERNAL_DB_METADATA_TTL)
+_exact_count_lock = threading.Lock()
+_count_executor = ThreadPoolExecutor(max_workers=settings.EXTERNAL_DB_COUNT_WORKERS)
+
+def _split_table_name(table_name: str):
+    schema, _, name = table_name.rpartition('.')
+    return schema or 'public', name
+
+def list_tables(db_connection, refresh: bool = False) -> List[str]:
+    """Tables of the public schema, cached per connection"""
+    key = (db_connection.id, 'tables')
+    tables = None if refresh else metadata_cache.get(key)
+
+    if tables is None:
+        with engine_registry.get(db_connection).connect() as conn:
+            result = conn.execute(text("""
+                SELECT tablename
+                FROM pg_tables
+                WHERE schemaname = 'public'
+                ORDER BY tablename
+            """))
+            tables = [row[0] for row in result]
+        metadata_cache.set(key, tables)
+
+    return tables
+
+def get_table_columns(db_connection, table_name: str, refresh: bool = False) -> List[Dict[str, str]]:
+    """Column names and data types of a table, cached per connection"""
+    key = (db_connection.id, 'columns', table_name)
+    columns = None if refresh else metadata_cache.get(key)
+
+    if columns is None:
+        schema, name = _split_table_name(table_name)
+        with engine_registry.get(db_connection).connect() as conn:
+            result = conn.execute(text("""
+                SELECT column_name, data_type
+                FROM information_schema.columns
+                WHERE table_schema = :schema AND table_name = :name
+                ORDER BY ordinal_position
+            """), {"schema": schema, "name": name})
+            columns = [{"name": row[0], "type": row[1]} for row in result]
+        metadata_cache.set(key, columns)
+
+    return columns
+
+def estimate_row_count(db_connection, table_name: str) -> int:
+    """
+    Planner estimate of the row count from pg_class.reltuples (no table scan).
+    Tables that were never analyzed fall back to pg_stat_user_tables.n_live_tup.
+    """
+    schema, name = _split_table_name(table_name)
+    with engine_registry.get(db_connection).connect() as conn:
+        result = conn.execute(text("""
+            SELECT CASE WHEN c.reltuples >= 0 THEN c.reltuples::bigint
+                        ELSE COALESCE(s.n_live_tup, 0) END
+            FROM pg_class c
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid
+            WHERE n.nspname = :schema AND c.relname = :name
+        """), {"schema": schema, "name": name})
+        row = result.fetchone()
+
+    return int(row[0]) if row else 0
+
+def _count_rows(engine, table_name: str, key):
+    schema, name = _split_table_name(table_name)
+    try:
+        with engine.connect() as conn:
+            row_count = conn.execute(select(func.count()).select_from(table(name, schema=schema))).scalar()
+        _exact_counts.set(key, {"status": "done", "row_count": row_count, "computed_at": datetime.utcnow()})
+    except Exception as e:
+        _exact_counts.set(key, {"status": "failed", "error": str(e)})
+
+def request_exact_count(db_connection, table_name: str) -> Dict[str, Any]:
+    """
+    Exact COUNT(*) of a table, computed asynchronously.
+    Returns the cached result (status 'done' or 'failed'), or starts the count
+    and returns status 'pending'.
+    """
+    key = (db_connection.id, table_name)
+    engine = engine_registry.get(db_connection)
+
+    with _exact_count_lock:
+        state = _exact_counts.get(key)
+        if state is None:
+            state = {"status": "pending"}
+            _exact_counts.set(key, state)
+            _count_executor.submit(_count_rows, engine, table_name, key)
+
+    return state
@@ -0,0 +1,225 @@
+import pandas as pd
+from pathlib import Path
+from typing import Dict, Any, Optional
+import json
+import mmap
+import os
+import uuid
+import warnings
+
+try:
+    from pandas.tseries.api import guess_datetime_format
+except ImportError:  # pandas < 2.2
+    from pandas._libs.tslibs.parsing import guess_datetime_format
+
+from config import settings
+
+PROFILE_SUFFIX = ".profile.json"
+PROFILE_VERSION = 2  # bump when the cached profile layout changes
+JSON_LINES_PROBE_BYTES = 1024 * 1024  # longest first line read to tell JSON lines from a single document
+
+def file_type_from_path(file_path) -> str:
+    """Return the file type ('csv', 'json', 'xlsx', 'xls') from the file extension"""
+    return Path(file_path).suffix.lower().lstrip('.')
+
+def profile_path(file_path) -> Path:
+    """Location of the cached profile stored next to the upload"""
+    file_path = Path(file_path)
+    return file_path.with_name(file_path.name + PROFILE_SUFFIX)
+
+def count_lines(file_path) -> int:
+    """Count lines by scanning newlines over a memory-mapped file"""
+    file_path = Path(file_path)
+    if file_path.stat().st_size == 0:
+        return 0
+
+    with open(file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        lines = 0
+        block_size = settings.PROFILE_SCAN_BLOCK_SIZE
+        for start in range(0, len(mm), block_size):
+            lines += mm[start:start + block_size].count(b"\n")
+
+        # Last line without a trailing newline
+        if mm[-1:] != b"\n":
+            lines += 1
+
+    return lines
+
+def _is_record(line: bytes) -> bool:
+    """Whether a line holds a complete JSON object of scalar values (one row)"""
+    try:
+        value = json.loads(line)
+    except ValueError:
+        return False
+    return isinstance(value, dict) and not any(isinstance(item, (dict, list)) for item in value.values())
+
+def is_json_lines(file_path: Path) -> bool:
+    """
+    Whether a JSON file holds one record per line rather than a single document
+    (an array, or an object of columns as written by DataFrame.to_json): the
+    first line must be a complete object, followed by another record or by
+    nothing but whitespace if it is a single row of scalars
+    """
+    with open(file_path, "rb") as f:
+        first = b""
+        while not first.strip():
+            first = f.readline(JSON_LINES_PROBE_BYTES)
+            if not first:
+                return False
+        if not first.endswith(b"\n") and len(first) == JSON_LINES_PROBE_BYTES:
+            return False  # longer than any plausible record: a single document
+
+        second = b""
+        while not second.strip():
+            second = f.readline(JSON_LINES_PROBE_BYTES)
+            if not second:
+                return _is_record(first)
+
+    try:
+        return isinstance(json.loads(first), dict)
+    except ValueError:
+        return False
+
+def _count_excel_rows(file_path: Path, file_type: str) -> int:
+    if file_type == 'xlsx':
+        from openpyxl import load_workbook
+        workbook = load_workbook(file_path, read_only=True)
+        try:
+            max_row = workbook.worksheets[0].max_row
+        finally:
+            workbook.close()
+        if max_row is not None:
+            return max(max_row - 1, 0)
+    else:
+        import xlrd
+        workbook = xlrd.open_workbook(file_path, on_demand=True)
+        try:
+            return max(workbook.sheet_by_index(0).nrows - 1, 0)
+        finally:
+            workbook.release_resources()
+
+    # Worksheet without dimension information
+    return len(pd.read_excel(file_path, usecols=[0]))
+
+def _read_sample(file_path: Path, file_type: str):
+    """Read the first PROFILE_INFER_ROWS rows and the total row count"""
+    nrows = settings.PROFILE_INFER_ROWS
+
+    if file_type == 'csv':
+        df = pd.read_csv(file_path, nrows=nrows)
+        row_count = max(count_lines(file_path) - 1, 0)  # minus header
+    elif file_type == 'json':
+        if is_json_lines(file_path):
+            df = pd.read_json(file_path, lines=True, nrows=nrows)
+            row_count = count_lines(file_path)
+        else:
+            # A JSON array cannot be read partially, parse once and cache
+            full_df = pd.read_json(file_path)
+            row_count = len(full_df)
+            df = full_df.head(nrows)
+    elif file_type in ['xlsx', 'xls']:
+        df = pd.read_excel(file_path, nrows=nrows)
+        row_count = _count_excel_rows(file_path, file_type)
+    else:
+        raise ValueError(f"Unsupported file type: {file_type}")
+
+    return df, row_count
+
+def detect_date_formats(df: pd.DataFrame) -> Dict[str, str]:
+    """
+    Detect the datetime format of text columns from a sample, so the full column
+    can later be parsed with an explicit format instead of per-element inference.
+    Only formats that parse every sampled value are returned.
+    """
+    date_formats = {}
+    for col in df.columns:
+        if df[col].dtype != object:
+            continue
+
+        values = df[col].dropna()
+        if values.empty or not all(isinstance(value, str) for value in values):
+            continue
+
+        for dayfirst in (False, True):
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                date_format = guess_datetime_format(values.iloc[0], dayfirst=dayfirst)
+            if date_format is None:
+                continue
+
+            try:
+                pd.to_datetime(values, format=date_format)
+            except (ValueError, TypeError):
+                continue
+            date_formats[col] = date_format
+            break
+
+    return date_formats
+
+def _load_cached_profile(file_path: Path, stat: os.stat_result) -> Optional[Dict[str, Any]]:
+    cache_path = profile_path(file_path)
+    if not cache_path.exists():
+        return None
+
+    try:
+        with open(cache_path) as f:
+            profile = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if profile.get("version") != PROFILE_VERSION:
+        return None
+
+    source = profile.get("source", {})
+    if source.get("size") != stat.st_size or source.get("mtime_ns") != stat.st_mtime_ns:
+        return None
+
+    return profile
+
+def _save_profile(file_path: Path, profile: Dict[str, Any]):
+    cache_path = profile_path(file_path)
+    # Unique temporary name: the same file can be profiled from several threads
+    tmp_path = cache_path.with_name(f"{cache_path.name}.{uuid.uuid4().hex}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(profile, f)
+    os.replace(tmp_path, cache_path)
+
+def profile_file(file_path, file_type: str = None, sample_rows: int = 5) -> Dict[str, Any]:
+    """
+    Profile an uploaded file without parsing all of it.
+
+    Only the header and the first PROFILE_INFER_ROWS rows are parsed (dtypes are
+    inferred from them); CSV and JSON lines rows are counted by scanning newlines.
+    Datetime formats of text columns are detected once (see detect_date_formats).
+    The result is cached next to the upload and reused while the file is unchanged.
+    Returns dict with columns, row_count, dtypes, date_formats and sample_data.
+    """
+    file_path = Path(file_path)
+    file_type = file_type or file_type_from_path(file_path)
+    stat = file_path.stat()
+
+    profile = _load_cached_profile(file_path, stat)
+    if profile is None:
+        df, row_count = _read_sample(file_path, file_type)
+
+        profile = {
+            "version": PROFILE_VERSION,
+            "source": {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns},
+            "columns": df.columns.tolist(),
+            "row_count": row_count,
+            "dtypes": {col: str(dtype) for col, dtype in df.dtypes.items()},
+            "date_formats": detect_date_formats(df),
+            # to_json handles NaN and timestamps so the sample can be cached as-is
+            "sample_data": json.loads(
+                df.head(settings.PROFILE_SAMPLE_ROWS).to_json(orient='records', date_format='iso')
+            )
+        }
+        _save_profile(file_path, profile)
+
+    return {
+        "columns": profile["columns"],
+        "row_count": profile["row_count"],
+        "dtypes": profile["dtypes"],
+        "date_formats": profile["date_formats"],
+        "sample_data": profile["sample_data"][:sample_rows]
+    }
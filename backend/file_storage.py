@@ -0,0 +1,216 @@
+from fastapi import HTTPException, UploadFile, status
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Tuple
+import glob
+import hashlib
+import json
+import os
+import uuid
+
+from config import settings
+from models import UploadedBlob, UploadedBlobUser
+
+HASH_SUFFIX = ".sha256"
+
+# Sub-directories of UPLOAD_DIR: stored files by content hash, and uploads still arriving
+OBJECTS_DIR = "objects"
+INCOMING_DIR = "incoming"
+
+def _hash_path(file_path: Path) -> Path:
+    return file_path.with_name(file_path.name + HASH_SUFFIX)
+
+def save_content_hash(file_path, sha256: str):
+    """Store the SHA-256 of a file next to it, valid while its size and mtime are unchanged"""
+    file_path = Path(file_path)
+    stat = file_path.stat()
+    hash_path = _hash_path(file_path)
+    tmp_path = hash_path.with_name(f"{hash_path.name}.{uuid.uuid4().hex}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump({"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": sha256}, f)
+    os.replace(tmp_path, hash_path)
+
+def content_hash(file_path) -> str:
+    """SHA-256 of a file's contents, from the stored digest when the file is unchanged"""
+    file_path = Path(file_path)
+    stat = file_path.stat()
+    try:
+        with open(_hash_path(file_path)) as f:
+            stored = json.load(f)
+        if stored["size"] == stat.st_size and stored["mtime_ns"] == stat.st_mtime_ns:
+            return stored["sha256"]
+    except (OSError, ValueError, KeyError):
+        pass
+
+    hasher = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(settings.UPLOAD_CHUNK_SIZE), b""):
+            hasher.update(chunk)
+    sha256 = hasher.hexdigest()
+    save_content_hash(file_path, sha256)
+    return sha256
+
+async def _stream_upload(upload: UploadFile, destination: Path) -> Tuple[int, str]:
+    """
+    Stream an uploaded file to disk chunk by chunk.
+
+    The size limit is enforced while bytes arrive and the SHA-256 digest is
+    computed on the fly, so peak memory per upload stays at one chunk.
+    Returns (size_in_bytes, sha256_hex). A partially written file is removed
+    if the upload is rejected or fails.
+    """
+    hasher = hashlib.sha256()
+    size = 0
+
+    try:
+        with open(destination, "wb") as buffer:
+            while True:
+                chunk = await upload.read(settings.UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+
+                size += len(chunk)
+                if size > settings.MAX_FILE_SIZE:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail="File too large"
+                    )
+
+                hasher.update(chunk)
+                await run_in_threadpool(buffer.write, chunk)
+    except BaseException:
+        destination.unlink(missing_ok=True)
+        raise
+
+    return size, hasher.hexdigest()
+
+def object_path(sha256: str, extension: str) -> Path:
+    """Where an upload with the given contents is stored: UPLOAD_DIR/objects/<sha[:2]>/<sha><ext>"""
+    return Path(settings.UPLOAD_DIR) / OBJECTS_DIR / sha256[:2] / f"{sha256}{extension}"
+
+def _register_blob(db: Session, file_path: Path, sha256: str, size: int, user_id: int):
+    """
+    Record a stored file and its uploader, or mark an existing record as just used
+    so it is not collected. The row is locked: a collection in progress on it
+    finishes first (file and row gone), and the record is then created again.
+    """
+    for _ in range(2):
+        blob = db.query(UploadedBlob).filter(UploadedBlob.file_path == str(file_path)).with_for_update().first()
+        if blob is None:
+            blob = UploadedBlob(file_path=str(file_path), sha256=sha256, file_size=size)
+            db.add(blob)
+        else:
+            blob.last_used_at = datetime.utcnow()
+        if not any(uploader.user_id == user_id for uploader in blob.uploaders):
+            blob.uploaders.append(UploadedBlobUser(user_id=user_id))
+        try:
+            db.commit()
+            return
+        except IntegrityError:
+            # The same contents were registered by a concurrent upload: update that record
+            db.rollback()
+    raise RuntimeError(f"Could not register upload {file_path}")
+
+async def store_upload(upload: UploadFile, extension: str, db: Session, user_id: int) -> Tuple[Path, int, str]:
+    """
+    Stream an upload into the content-addressed store and return (path, size, sha256).
+
+    Identical bytes are stored once, whoever uploads them: when the file exists
+    already the new copy is dropped, so its profile, columnar copy and hash
+    (stored next to it) are reused as well. The blob record, with the user as
+    one of its uploaders, is committed here; call retain_upload once a project
+    or additional file points at the path.
+    """
+    incoming_dir = Path(settings.UPLOAD_DIR) / INCOMING_DIR
+    incoming_dir.mkdir(parents=True, exist_ok=True)
+    tmp_path = incoming_dir / f"{uuid.uuid4().hex}.tmp"
+
+    size, sha256 = await _stream_upload(upload, tmp_path)
+    file_path = object_path(sha256, extension)
+    try:
+        # Registered first: from now on the file is not collected for UPLOAD_UNREFERENCED_TTL,
+        # and a file still missing afterwards (new, or just collected) is put in place
+        _register_blob(db, file_path, sha256, size, user_id)
+        if not file_path.exists():
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(tmp_path, file_path)
+            save_content_hash(file_path, sha256)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+    return file_path, size, sha256
+
+def is_user_upload(db: Session, file_path, user_id: int) -> bool:
+    """Whether the user uploaded the stored file at file_path (and may point a project at it)"""
+    return db.query(UploadedBlobUser.id).join(UploadedBlob).filter(
+        UploadedBlob.file_path == str(file_path),
+        UploadedBlobUser.user_id == user_id
+    ).first() is not None
+
+def retain_upload(db: Session, file_path):
+    """Count one more project or additional file using a stored upload (committed by the caller)"""
+    db.query(UploadedBlob).filter(UploadedBlob.file_path == str(file_path)).update({
+        UploadedBlob.ref_count: UploadedBlob.ref_count + 1,
+        UploadedBlob.last_used_at: datetime.utcnow()
+    }, synchronize_session=False)
+
+def release_upload(db: Session, file_path):
+    """
+    Count one user less of a stored upload (committed by the caller); the file is
+    removed by collect_unreferenced_uploads once unused for UPLOAD_UNREFERENCED_TTL.
+    Files uploaded before the store existed have a single user and are deleted now.
+    """
+    released = db.query(UploadedBlob).filter(
+        UploadedBlob.file_path == str(file_path),
+        UploadedBlob.ref_count > 0
+    ).update({
+        UploadedBlob.ref_count: UploadedBlob.ref_count - 1,
+        UploadedBlob.last_used_at: datetime.utcnow()
+    }, synchronize_session=False)
+
+    if not released and not db.query(UploadedBlob.id).filter(UploadedBlob.file_path == str(file_path)).first():
+        if _in_upload_dir(file_path):
+            delete_upload(file_path)
+
+def collect_unreferenced_uploads(db: Session) -> int:
+    """
+    Delete stored uploads no project or additional file has used for
+    UPLOAD_UNREFERENCED_TTL seconds (the delay keeps files that were just
+    uploaded and are not attached yet). Returns the number of files removed.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=settings.UPLOAD_UNREFERENCED_TTL)
+    unused = (UploadedBlob.ref_count == 0, UploadedBlob.last_used_at < cutoff)
+    candidates = db.query(UploadedBlob.id, UploadedBlob.file_path).filter(*unused).all()
+
+    removed = 0
+    for blob_id, file_path in candidates:
+        # Checked again under a row lock (the same contents may have been uploaded
+        # meanwhile). The file goes before the row: an upload waiting on the lock
+        # then finds it missing and stores its own copy.
+        blob = db.query(UploadedBlob).filter(UploadedBlob.id == blob_id, *unused).with_for_update().first()
+        if blob is None:
+            db.rollback()
+            continue
+        delete_upload(file_path)
+        db.delete(blob)
+        db.commit()
+        removed += 1
+    return removed
+
+def _in_upload_dir(file_path) -> bool:
+    return Path(file_path).resolve().is_relative_to(Path(settings.UPLOAD_DIR).resolve())
+
+def delete_upload(file_path):
+    """
+    Delete an uploaded file together with the cached artifacts stored next to it.
+    Raises ValueError for paths outside UPLOAD_DIR.
+    """
+    if not _in_upload_dir(file_path):
+        raise ValueError(f"Not an uploaded file: {file_path}")
+    file_path = Path(file_path)
+    for artifact in file_path.parent.glob(f"{glob.escape(file_path.name)}.*"):
+        artifact.unlink(missing_ok=True)
+    file_path.unlink(missing_ok=True)
@@ -0,0 +1,177 @@
+import pandas as pd
+from sqlalchemy.orm import Session
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+import hashlib
+import uuid
+
+from config import settings
+from models import AggregationCheckpoint
+from data_loader import complete_lines_end, iter_text_chunks, iter_query_chunks
+from file_profiler import file_type_from_path, is_json_lines
+from periods import period_starts
+from streaming_aggregation import IncrementalAggregator, can_stream
+
+CHECKPOINT_VERSION = 2  # bump when the state layout changes
+
+def _state_files(project_id: int) -> List[Path]:
+    return list(Path(settings.CHECKPOINT_DIR).glob(f"project_{project_id}_*.parquet"))
+
+def _new_state_path(project_id: int) -> Path:
+    # A new file per run: the checkpoint row keeps pointing at the previous
+    # states until the session commits, so a failed run cannot desync them
+    return Path(settings.CHECKPOINT_DIR) / f"project_{project_id}_{uuid.uuid4().hex}.parquet"
+
+def supports_incremental(project, aggregations: Dict[str, str]) -> bool:
+    """
+    Sources that can be read from a watermark: CSV / JSON lines files (byte offset)
+    and database tables or queries (date filter). Aggregations must have mergeable
+    partial states.
+    """
+    if not can_stream(aggregations):
+        return False
+    if project.source_type == "db":
+        return True
+    file_type = file_type_from_path(project.file_path)
+    return file_type == 'csv' or (file_type == 'json' and is_json_lines(project.file_path))
+
+def _source_signature(project, period: str, aggregations: Dict[str, str]) -> Dict[str, Any]:
+    """
+    What the partial states depend on; any change means a full pass. Files are
+    not identified by path: every upload is stored under a new path (its content
+    hash), so a re-uploaded file is matched by its prefix instead (_is_appended).
+    """
+    return {
+        "version": CHECKPOINT_VERSION,
+        "source_type": project.source_type,
+        "file_type": file_type_from_path(project.file_path) if project.source_type == "file" else None,
+        "db_connection_id": project.db_connection_id,
+        "table_name": project.table_name,
+        "query": project.query,
+        "date_column": project.date_column,
+        "product_column": project.product_column,
+        "period": period,
+        "aggregations": aggregations
+    }
+
+def _prefix_hash(file_path, end: int) -> str:
+    """SHA-256 of the first end bytes of a file"""
+    hasher = hashlib.sha256()
+    remaining = end
+    with open(file_path, "rb") as f:
+        while remaining > 0:
+            chunk = f.read(min(settings.UPLOAD_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            hasher.update(chunk)
+            remaining -= len(chunk)
+    return hasher.hexdigest()
+
+def _file_watermark(file_path, offset: int) -> Dict[str, Any]:
+    """Byte offset read so far, with the hash of all bytes before it"""
+    return {"offset": offset, "prefix_sha256": _prefix_hash(file_path, offset)}
+
+def _is_appended(file_path, watermark: Dict[str, Any]) -> bool:
+    """
+    Whether the file (the same upload, or a new upload of the grown file) starts
+    with exactly the bytes read up to the watermark
+    """
+    offset = watermark.get("offset", 0)
+    if "prefix_sha256" not in watermark or Path(file_path).stat().st_size < offset:
+        return False
+    return _prefix_hash(file_path, offset) == watermark["prefix_sha256"]
+
+def delete_checkpoint_states(project_id: int, keep: str = None):
+    """Remove the partial states files of a project, except the one at keep"""
+    for path in _state_files(project_id):
+        if keep is None or path != Path(keep):
+            path.unlink(missing_ok=True)
+
+def aggregate_incremental(db: Session, project, period: str, aggregations: Dict[str, str],
+                          columns: List[str], dtypes: Dict[str, str],
+                          engine=None) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """
+    Aggregate the main source starting from the project's checkpoint.
+
+    Files: rows past the stored byte offset are merged into the saved partial
+    states, provided the file starts with the bytes read before (an upload of
+    the previous file with rows appended); otherwise the whole file is read again.
+    Databases: states of the last (open) period are dropped and rows dated from
+    that period's start are read again, which assumes rows are not back-dated
+    before the open period.
+
+    The checkpoint row is added to the session but not committed; the previous
+    states file is removed by the next run once the new one is committed.
+    Returns the aggregated frame and a dict describing the run.
+    """
+    product_column = project.product_column if project.product_column in columns else None
+    aggregator = IncrementalAggregator(project.date_column, period, aggregations, product_column)
+    signature = _source_signature(project, period, aggregations)
+
+    checkpoint = db.query(AggregationCheckpoint).filter(
+        AggregationCheckpoint.project_id == project.id
+    ).first()
+    # Leftovers of runs that did not commit
+    delete_checkpoint_states(project.id, keep=checkpoint.state_path if checkpoint else None)
+    resume = (
+        checkpoint is not None
+        and checkpoint.signature == signature
+        and Path(checkpoint.state_path).exists()
+    )
+    state_path = Path(checkpoint.state_path) if resume else None
+
+    if project.source_type == "file":
+        end = complete_lines_end(project.file_path)
+        start = 0
+        if resume and _is_appended(project.file_path, checkpoint.watermark):
+            aggregator.load_state(state_path, checkpoint.watermark.get("categorical", False))
+            start = checkpoint.watermark["offset"]
+        else:
+            resume = False
+
+        for chunk in iter_text_chunks(project.file_path, start=start, end=end, columns=columns,
+                                      dtypes=dtypes, parse_dates=[project.date_column]):
+            aggregator.update(chunk)
+        watermark = _file_watermark(project.file_path, end)
+    else:
+        date_from = None
+        if resume:
+            aggregator.load_state(state_path, checkpoint.watermark.get("categorical", False))
+            open_code = aggregator.last_code()
+            if open_code is not None:
+                aggregator.discard_from(open_code)
+                date_from = period_starts([open_code], period)[0].to_pydatetime()
+
+        chunks = iter_query_chunks(
+            engine,
+            table_name=project.table_name,
+            query=project.query,
+            columns=columns,
+            dtypes=dtypes,
+            parse_dates=[project.date_column],
+            date_column=project.date_column,
+            date_from=date_from
+        )
+        for chunk in chunks:
+            aggregator.update(chunk)
+
+        open_code = aggregator.last_code()
+        watermark = {
+            "open_period_start": str(period_starts([open_code], period)[0]) if open_code is not None else None
+        }
+
+    watermark["categorical"] = aggregator.categorical
+    state_path = _new_state_path(project.id)
+    state_path.parent.mkdir(parents=True, exist_ok=True)
+    aggregator.save_state(state_path)
+
+    rows_read = aggregator.rows
+    if checkpoint is None:
+        checkpoint = AggregationCheckpoint(project_id=project.id)
+        db.add(checkpoint)
+    checkpoint.signature = signature
+    checkpoint.watermark = watermark
+    checkpoint.state_path = str(state_path)
+    checkpoint.rows_processed = (checkpoint.rows_processed or 0) + rows_read if resume else rows_read
+
+    return aggregator.result(), {"mode": "incremental" if resume else "full", "rows_read": rows_read}
@@ -0,0 +1,141 @@
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+import threading
+import uuid
+
+from config import settings
+
+JOB_ACTIVE_STATUSES = ('queued', 'running')
+
+class Job:
+    """State of one background job, updated by the worker and read by status requests"""
+
+    def __init__(self, kind: str, key: Any, user_id: int = None, params: Dict[str, Any] = None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.key = key
+        self.user_id = user_id
+        self.params = params
+        self.status = 'queued'
+        self.progress = 0.0
+        self.message = None
+        self.result = None
+        self.error = None
+        self.created_at = datetime.utcnow()
+        self.started_at = None
+        self.finished_at = None
+        self._done = threading.Event()
+
+    @property
+    def active(self) -> bool:
+        return self.status in JOB_ACTIVE_STATUSES
+
+    def report(self, progress: float, message: str = None):
+        """Record progress (0..1) and an optional step description"""
+        self.progress = min(max(progress, 0.0), 1.0)
+        if message is not None:
+            self.message = message
+
+    def wait(self, timeout: float = None) -> bool:
+        """Block until the job has finished; False on timeout"""
+        return self._done.wait(timeout)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "params": self.params,
+            "status": self.status,
+            "progress": self.progress,
+            "message": self.message,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at
+        }
+
+class JobConflict(Exception):
+    """A job of the same kind and key is already active with different params"""
+
+    def __init__(self, job: Job):
+        super().__init__(f"Job {job.id} is already active with different settings")
+        self.job = job
+
+class JobManager:
+    """
+    Runs blocking work (pandas, SQLAlchemy) on a thread pool away from the event loop.
+
+    Jobs are identified by a random id and deduplicated by (kind, key): submitting
+    while a job for the same key is queued or running returns that job instead of
+    starting another one, or raises JobConflict when its params differ. The last JOB_HISTORY_SIZE finished jobs are kept in
+    memory for status polling.
+    """
+
+    def __init__(self, max_workers: int, history_size: int):
+        self.history_size = history_size
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._active: Dict[tuple, Job] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, key: Any, fn: Callable[..., Any], *args,
+               user_id: int = None, params: Dict[str, Any] = None) -> Job:
+        """
+        Schedule fn(job, *args) unless a job of this kind and key is still active.
+        The return value of fn becomes job.result. An active job is returned when
+        it was submitted with the same params; JobConflict is raised otherwise.
+        """
+        with self._lock:
+            job = self._active.get((kind, key))
+            if job is not None:
+                if job.params != params:
+                    raise JobConflict(job)
+                return job
+
+            job = Job(kind, key, user_id, params)
+            self._jobs[job.id] = job
+            self._active[(kind, key)] = job
+            self._prune()
+
+        self._executor.submit(self._run, job, fn, args)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, job: Job, fn: Callable[..., Any], args: tuple):
+        job.status = 'running'
+        job.started_at = datetime.utcnow()
+        try:
+            job.result = fn(job, *args)
+            job.progress = 1.0
+            job.status = 'completed'
+        except Exception as e:
+            job.error = str(e)
+            job.status = 'failed'
+        finally:
+            job.finished_at = datetime.utcnow()
+            with self._lock:
+                if self._active.get((job.kind, job.key)) is job:
+                    del self._active[(job.kind, job.key)]
+            job._done.set()
+
+    def _prune(self):
+        """Forget the oldest finished jobs beyond history_size (caller holds the lock)"""
+        excess = len(self._jobs) - self.history_size
+        if excess <= 0:
+            return
+        for job_id in [job_id for job_id, job in self._jobs.items() if not job.active][:excess]:
+            del self._jobs[job_id]
+
+job_manager = JobManager(
+    max_workers=settings.JOB_MAX_WORKERS,
+    history_size=settings.JOB_HISTORY_SIZE
+)
@@ -2,13 +2,18 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from pathlib import Path
 
-from database import get_db, engine
+from database import get_db, engine, SessionLocal
 from models import Base
+from schema_upgrades import upgrade_schema
 from routers import auth, data_source, features, models as model_router, projects, additional_files, aggregation
 from config import settings
+from db_engines import engine_registry
+from jobs import job_manager
+from file_storage import collect_unreferenced_uploads
 
-# Create tables
+# Create tables, then add columns and indexes missing from existing ones
 Base.metadata.create_all(bind=engine)
+upgrade_schema(engine)
 
 app = FastAPI(title="ML Constructor", version="1.0.0")
 
@@ -38,6 +43,22 @@ app.include_router(features.router, prefix="/api/features", tags=["features"])
 app.include_router(model_router.router, prefix="/api/models", tags=["models"])
 app.include_router(projects.router, prefix="/api", tags=["projects"])
 
+@app.on_event("startup")
+def remove_unreferenced_uploads():
+    db = SessionLocal()
+    try:
+        collect_unreferenced_uploads(db)
+    finally:
+        db.close()
+
+@app.on_event("shutdown")
+def dispose_external_engines():
+    engine_registry.dispose_all()
+
+@app.on_event("shutdown")
+def stop_jobs():
+    job_manager.shutdown()
+
 @app.get("/")
 def read_root():
     return {"message": "ML Constructor API"}
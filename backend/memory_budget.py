@@ -0,0 +1,91 @@
+import pandas as pd
+import numpy as np
+from typing import Any, Dict, Iterable, Optional
+import os
+import resource
+import sys
+import threading
+
+from config import settings
+
+def effective_budget(budget_mb: Optional[int] = None) -> Optional[int]:
+    """Per-job budget when given, otherwise MEMORY_BUDGET_MB (None = no budget)"""
+    return budget_mb if budget_mb is not None else settings.MEMORY_BUDGET_MB
+
+def frame_memory_mb(df: pd.DataFrame) -> float:
+    return df.memory_usage(deep=True).sum() / (1024 * 1024)
+
+def downcast_frame(df: pd.DataFrame, exclude: Iterable[str] = ()) -> pd.DataFrame:
+    """
+    Shrink the columns of a frame the caller owns (modified in place and returned):
+    floats to float32, integers to the smallest of int8/int16/int32 holding their
+    range, and text columns with few distinct values (at most
+    CATEGORICAL_MAX_UNIQUE_RATIO of the rows) to categoricals.
+    """
+    exclude = set(exclude)
+    for col in df.columns:
+        if col in exclude:
+            continue
+
+        values = df[col]
+        if pd.api.types.is_float_dtype(values.dtype):
+            df[col] = values.astype(np.float32)
+        elif pd.api.types.is_integer_dtype(values.dtype) and not pd.api.types.is_bool_dtype(values.dtype):
+            df[col] = pd.to_numeric(values, downcast='integer')
+        elif values.dtype == object and len(values):
+            non_null = values.dropna()
+            if not non_null.map(lambda value: isinstance(value, str)).all():
+                continue
+            if non_null.nunique() <= settings.CATEGORICAL_MAX_UNIQUE_RATIO * len(values):
+                df[col] = values.astype('category')
+
+    return df
+
+def _current_rss() -> int:
+    """Resident set size of this process in bytes"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # No procfs: fall back to the peak so far (bytes on macOS, kilobytes elsewhere)
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+class MemoryMonitor:
+    """
+    Context manager sampling the process RSS every MEMORY_SAMPLE_INTERVAL seconds
+    on a background thread and keeping the peak. RSS is process-wide, so jobs
+    running at the same time are included in each other's figures.
+    """
+
+    def __init__(self, budget_mb: Optional[int] = None):
+        self.budget_mb = budget_mb
+        self.start = 0
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        while not self._stop.wait(settings.MEMORY_SAMPLE_INTERVAL):
+            self.peak = max(self.peak, _current_rss())
+
+    def __enter__(self) -> "MemoryMonitor":
+        self.start = self.peak = _current_rss()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, _current_rss())
+
+    def report(self) -> Dict[str, Any]:
+        mb = 1024 * 1024
+        increase_mb = (self.peak - self.start) / mb
+        return {
+            "budget_mb": self.budget_mb,
+            "peak_rss_mb": round(self.peak / mb, 1),
+            "peak_increase_mb": round(increase_mb, 1),
+            "within_budget": increase_mb <= self.budget_mb if self.budget_mb is not None else None
+        }
@@ -1,6 +1,6 @@
 from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, JSON, Float, LargeBinary
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred
 from datetime import datetime
 
 Base = declarative_base()
@@ -44,9 +44,9 @@ class Project(Base):
     aggregation_period = Column(String)  # 'daily', 'weekly', 'monthly'
     aggregation_completed = Column(Boolean, default=False)
     
-    # Feature generation settings
-    date_features = Column(JSON)
-    numerical_features = Column(JSON)
+    # Feature generation settings (deferred: loaded together on first access)
+    date_features = deferred(Column(JSON), group="feature_settings")
+    numerical_features = deferred(Column(JSON), group="feature_settings")
     features_generated = Column(Boolean, default=False)
     
     # Model settings
@@ -60,6 +60,7 @@ class Project(Base):
     additional_files = relationship("AdditionalFile", back_populates="project", cascade="all, delete-orphan")
     aggregated_data = relationship("AggregatedData", back_populates="project", cascade="all, delete-orphan")
     generated_features = relationship("GeneratedFeatures", back_populates="project", cascade="all, delete-orphan")
+    aggregation_checkpoint = relationship("AggregationCheckpoint", back_populates="project", uselist=False, cascade="all, delete-orphan")
 
 class DatabaseConnection(Base):
     __tablename__ = "database_connections"
@@ -77,17 +78,43 @@ class DatabaseConnection(Base):
     # Relationship
     user = relationship("User", back_populates="db_connections")
 
+class UploadedBlob(Base):
+    __tablename__ = "uploaded_blobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    file_path = Column(String, unique=True, nullable=False)  # uploads/objects/<sha[:2]>/<sha><ext>
+    sha256 = Column(String, index=True, nullable=False)
+    file_size = Column(Integer)
+    
+    # Projects and additional files using the file; unreferenced files are removed after UPLOAD_UNREFERENCED_TTL
+    ref_count = Column(Integer, default=0, nullable=False)
+    last_used_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    # Relationship
+    uploaders = relationship("UploadedBlobUser", cascade="all, delete-orphan")
+
+class UploadedBlobUser(Base):
+    """A user who uploaded the blob's contents, and may therefore use its path in projects"""
+    __tablename__ = "uploaded_blob_users"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    blob_id = Column(Integer, ForeignKey("uploaded_blobs.id"), index=True, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True, nullable=False)
+    uploaded_at = Column(DateTime, default=datetime.utcnow)
+
 class AdditionalFile(Base):
     __tablename__ = "additional_files"
     
     id = Column(Integer, primary_key=True, index=True)
-    project_id = Column(Integer, ForeignKey("projects.id"))
+    project_id = Column(Integer, ForeignKey("projects.id"), index=True)
     file_name = Column(String, nullable=False)
     file_path = Column(String, nullable=False)
     file_type = Column(String)  # 'csv', 'json', 'xlsx'
     
     # Column mappings for this additional file
     date_column = Column(String)
+    product_column = Column(String)  # Matched with the project's product column
     selected_columns = Column(JSON)  # List of selected column names
     column_aggregations = Column(JSON)  # Dict: {column_name: aggregation_function}
     
@@ -103,29 +130,59 @@ class AggregatedData(Base):
     __tablename__ = "aggregated_data"
     
     id = Column(Integer, primary_key=True, index=True)
-    project_id = Column(Integer, ForeignKey("projects.id"))
+    project_id = Column(Integer, ForeignKey("projects.id"), index=True)
+    
+    # Parquet file with the aggregated frame (see artifacts)
+    artifact_path = Column(String)
+    artifact_size = Column(Integer)  # bytes
     
-    # Store aggregated data as JSON
-    data = Column(JSON, nullable=False)
+    # Rows as JSON, only for results stored before artifacts existed (loaded on first access)
+    data = deferred(Column(JSON))
     
     # Metadata
     period = Column(String)  # 'daily', 'weekly', 'monthly'
     row_count = Column(Integer)
     columns = Column(JSON)  # List of column names
+    cache_key = Column(String, index=True)  # Hash of the inputs (see aggregation_cache)
     
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Relationship
     project = relationship("Project", back_populates="aggregated_data")
 
+class AggregationCheckpoint(Base):
+    __tablename__ = "aggregation_checkpoints"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    project_id = Column(Integer, ForeignKey("projects.id"), unique=True)
+    
+    # Source and settings the partial states were computed for
+    signature = Column(JSON, nullable=False)
+    
+    # High-watermark of the main source: byte offset (files) or open period start (db)
+    watermark = Column(JSON, nullable=False)
+    
+    # Parquet file with partial aggregates per (product, period)
+    state_path = Column(String, nullable=False)
+    rows_processed = Column(Integer, default=0)
+    
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Relationship
+    project = relationship("Project", back_populates="aggregation_checkpoint")
+
 class GeneratedFeatures(Base):
     __tablename__ = "generated_features"
     
     id = Column(Integer, primary_key=True, index=True)
-    project_id = Column(Integer, ForeignKey("projects.id"))
+    project_id = Column(Integer, ForeignKey("projects.id"), index=True)
+    
+    # Parquet file with the features frame (see artifacts)
+    artifact_path = Column(String)
+    artifact_size = Column(Integer)  # bytes
     
-    # Store generated features data as JSON with _gf prefix in table logic
-    data = Column(JSON, nullable=False)
+    # Rows as JSON, only for results stored before artifacts existed (loaded on first access)
+    data = deferred(Column(JSON))
     
     # Metadata
     row_count = Column(Integer)
@@ -146,7 +203,7 @@ class MLModel(Base):
     parameters = Column(JSON)
     metrics = Column(JSON)
     model_path = Column(String)
-    project_id = Column(Integer, ForeignKey("projects.id"))
+    project_id = Column(Integer, ForeignKey("projects.id"), index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Relationship
@@ -0,0 +1,83 @@
+import pandas as pd
+import numpy as np
+from typing import Dict
+
+from calendar_index import period_keys
+
+# Aggregation functions whose value for a period without data is 0 (as in pandas resample)
+ZERO_FILLED_AGGREGATIONS = {'sum', 'count'}
+
+def period_codes(dates: pd.Series, period: str) -> np.ndarray:
+    """
+    Integer code of the period each date falls into (days, weeks ending Sunday
+    or months since the epoch), consistent with the resample labels below.
+    Weeks and months are gathered from the shared calendar table.
+    """
+    if period in ('weekly', 'monthly'):
+        return period_keys(dates, period)
+    return dates.to_numpy(dtype='datetime64[ns]').astype('datetime64[D]').astype(np.int64)
+
+def period_labels(codes: np.ndarray, period: str) -> pd.DatetimeIndex:
+    """Period end dates for period codes ('W' -> Sunday, 'M' -> month end, 'D' -> day)"""
+    codes = np.asarray(codes, dtype=np.int64)
+    if period == 'weekly':
+        days = (codes * 7 + 3).astype('datetime64[D]')
+    elif period == 'monthly':
+        days = (codes + 1).astype('datetime64[M]').astype('datetime64[D]') - np.timedelta64(1, 'D')
+    else:
+        days = codes.astype('datetime64[D]')
+    return pd.DatetimeIndex(days.astype('datetime64[ns]'))
+
+def period_starts(codes: np.ndarray, period: str) -> pd.DatetimeIndex:
+    """First day of the periods with the given codes (Monday for weeks)"""
+    codes = np.asarray(codes, dtype=np.int64)
+    if period == 'weekly':
+        days = (codes * 7 - 3).astype('datetime64[D]')
+    elif period == 'monthly':
+        days = codes.astype('datetime64[M]').astype('datetime64[D]')
+    else:
+        days = codes.astype('datetime64[D]')
+    return pd.DatetimeIndex(days.astype('datetime64[ns]'))
+
+def complete_periods(df: pd.DataFrame, date_column: str, period: str, aggregations: Dict[str, str],
+                     product_column: str = None) -> pd.DataFrame:
+    """
+    Insert rows for periods without data between the first and last period
+    (per product when product_column is given), as pandas resample does.
+    Sum and count become 0 for those periods, other aggregations NaN.
+    """
+    if df.empty:
+        return df
+
+    codes = period_codes(df[date_column], period)
+
+    if product_column:
+        bounds = pd.DataFrame({'product': df[product_column].to_numpy(), 'code': codes}).groupby(
+            'product', sort=False
+        )['code'].agg(['min', 'max'])
+        lengths = (bounds['max'] - bounds['min'] + 1).to_numpy()
+        offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        full_codes = np.repeat(bounds['min'].to_numpy(), lengths) + offsets
+        full_index = pd.MultiIndex.from_arrays([np.repeat(bounds.index.to_numpy(), lengths), full_codes])
+        keys = [df[product_column].to_numpy(), codes]
+    else:
+        full_codes = np.arange(codes.min(), codes.max() + 1)
+        full_index = pd.Index(full_codes)
+        keys = [codes]
+
+    value_columns = [col for col in df.columns if col not in (date_column, product_column)]
+    result = df[value_columns].set_index(keys).reindex(full_index)
+
+    for col in value_columns:
+        if aggregations.get(col) in ZERO_FILLED_AGGREGATIONS:
+            result[col] = result[col].fillna(0)
+
+    result = result.reset_index(drop=True)
+    result[date_column] = period_labels(full_codes, period)
+    if product_column:
+        product_values = full_index.get_level_values(0)
+        if isinstance(df[product_column].dtype, pd.CategoricalDtype):
+            product_values = pd.Categorical(product_values, categories=df[product_column].cat.categories)
+        result[product_column] = product_values
+
+    return result[df.columns.tolist()]
@@ -1,21 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, BackgroundTasks
 from sqlalchemy.orm import Session
-import pandas as pd
 from pathlib import Path
 from typing import List
-import uuid
 
 from database import get_db
 from models import User, Project, AdditionalFile as AdditionalFileModel
 from schemas import AdditionalFile, AdditionalFileColumnMapping, DataSourceInfo
 from routers.auth import get_current_user
-from config import settings
+from file_storage import store_upload, retain_upload, release_upload, collect_unreferenced_uploads
+from file_profiler import profile_file
+from data_loader import ensure_columnar
 
 router = APIRouter()
 
 @router.post("/projects/{project_id}/additional-files/upload")
 async def upload_additional_file(
     project_id: int,
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -40,28 +41,13 @@ async def upload_additional_file(
             detail=f"File type not supported. Allowed types: {', '.join(allowed_extensions)}"
         )
     
-    # Create unique filename
-    unique_filename = f"additional_{project_id}_{uuid.uuid4()}{file_extension}"
-    file_path = Path(settings.UPLOAD_DIR) / unique_filename
-    
-    # Save file
-    with open(file_path, "wb") as buffer:
-        content = await file.read()
-        if len(content) > settings.MAX_FILE_SIZE:
-            raise HTTPException(
-                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-                detail="File too large"
-            )
-        buffer.write(content)
+    # Stream file to the store (identical files are kept once), enforcing the size limit as it arrives
+    file_path, file_size, file_hash = await store_upload(file, file_extension, db, current_user.id)
     
     # Read and analyze file
+    additional_file = None
     try:
-        if file_extension == '.csv':
-            df = pd.read_csv(file_path)
-        elif file_extension == '.json':
-            df = pd.read_json(file_path)
-        elif file_extension in ['.xlsx', '.xls']:
-            df = pd.read_excel(file_path)
+        profile = profile_file(file_path, file_extension[1:])
         
         # Create database record
         additional_file = AdditionalFileModel(
@@ -72,28 +58,31 @@ async def upload_additional_file(
         )
         
         db.add(additional_file)
+        retain_upload(db, file_path)
         db.commit()
         db.refresh(additional_file)
         
-        # Get file info
-        columns = df.columns.tolist()
-        row_count = len(df)
-        sample_data = df.head(5).to_dict('records')
+        # Convert to the columnar cache after the response is sent
+        background_tasks.add_task(ensure_columnar, file_path, additional_file.file_type)
         
         return {
             "additional_file": additional_file,
+            "file_size": file_size,
+            "file_hash": file_hash,
             "source_info": {
                 "source_type": "additional_file",
-                "columns": columns,
-                "row_count": row_count,
-                "sample_data": sample_data
+                "columns": profile["columns"],
+                "row_count": profile["row_count"],
+                "dtypes": profile["dtypes"],
+                "sample_data": profile["sample_data"]
             }
         }
         
     except Exception as e:
-        # Clean up file if processing failed
-        file_path.unlink(missing_ok=True)
+        # Clean up the record if processing failed (the stored file may be shared:
+        # unused, it is removed by collect_unreferenced_uploads)
         if additional_file:
+            release_upload(db, file_path)
             db.delete(additional_file)
             db.commit()
         raise HTTPException(
@@ -150,19 +139,14 @@ def preview_additional_file(
         raise HTTPException(status_code=404, detail="Additional file not found")
     
     try:
-        # Read file
-        file_path = Path(additional_file.file_path)
-        if additional_file.file_type == 'csv':
-            df = pd.read_csv(file_path)
-        elif additional_file.file_type == 'json':
-            df = pd.read_json(file_path)
-        elif additional_file.file_type in ['xlsx', 'xls']:
-            df = pd.read_excel(file_path)
+        # Profile file (cached next to the upload)
+        profile = profile_file(additional_file.file_path, additional_file.file_type, sample_rows=10)
         
         return {
-            "columns": df.columns.tolist(),
-            "row_count": len(df),
-            "sample_data": df.head(10).to_dict('records'),
+            "columns": profile["columns"],
+            "row_count": profile["row_count"],
+            "dtypes": profile["dtypes"],
+            "sample_data": profile["sample_data"],
             "date_column": additional_file.date_column,
             "selected_columns": additional_file.selected_columns,
             "column_aggregations": additional_file.column_aggregations
@@ -203,6 +187,7 @@ def map_additional_file_columns(
     
     # Update column mappings
     additional_file.date_column = mapping.date_column
+    additional_file.product_column = mapping.product_column
     additional_file.selected_columns = mapping.selected_columns
     additional_file.column_aggregations = mapping.column_aggregations
     additional_file.fill_method = mapping.fill_method
@@ -238,14 +223,13 @@ def delete_additional_file(
     if not additional_file:
         raise HTTPException(status_code=404, detail="Additional file not found")
     
-    # Delete file from disk
-    file_path = Path(additional_file.file_path)
-    if file_path.exists():
-        file_path.unlink()
+    # Release the stored file (removed with its cached artifacts once no project uses it)
+    release_upload(db, additional_file.file_path)
     
     # Delete from database
     db.delete(additional_file)
     db.commit()
+    collect_unreferenced_uploads(db)
     
     return {"message": "Additional file deleted successfully"}
 
@@ -1,91 +1,184 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 import pandas as pd
 import numpy as np
-from pathlib import Path
-from typing import Dict, Any, List
-from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Union
+from datetime import date, datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 
-from database import get_db
+from config import settings
+from database import get_db, SessionLocal
 from models import User, Project, AdditionalFile, AggregatedData, DatabaseConnection
-from schemas import AggregationConfig, AggregatedDataResponse
+from schemas import AggregationConfig, AggregatedDataResponse, JobResponse, DataPageResponse
 from routers.auth import get_current_user
+from data_loader import (
+    load_file, load_query, iter_query_chunks, iter_file_chunks, is_large_file,
+    source_dtypes, apply_dtypes, ensure_datetime
+)
+from sql_pushdown import build_aggregation_query
+from periods import period_codes, period_labels, complete_periods
+from streaming_aggregation import can_stream, aggregate_chunks
+from file_profiler import profile_file
+from db_engines import engine_registry
+from jobs import Job, JobConflict, job_manager
+from incremental_aggregation import supports_incremental, aggregate_incremental
+from aggregation_cache import aggregation_cache_key, aggregation_cache_stats
+from memory_budget import MemoryMonitor, effective_budget, downcast_frame
+from artifacts import (
+    AGGREGATED_ARTIFACTS, write_artifact, read_artifact, artifact_sample, artifact_page, delete_artifacts
+)
 
 router = APIRouter()
 
-def aggregate_to_period(df: pd.DataFrame, date_column: str, period: str, aggregations: Dict[str, str]) -> pd.DataFrame:
+# Shared by all requests so the number of files parsed at once stays bounded
+_file_executor = ThreadPoolExecutor(max_workers=settings.AGGREGATION_MAX_WORKERS)
+
+def aggregate_to_period(df: pd.DataFrame, date_column: str, period: str, aggregations: Dict[str, str],
+                        product_column: str = None) -> pd.DataFrame:
     """
-    Aggregate dataframe to specified period
-    period: 'W' for weekly, 'M' for monthly
+    Aggregate dataframe to specified period, per product when product_column is given
+    period: 'daily', 'weekly' or 'monthly'
     aggregations: dict of column_name: aggregation_function
+
+    Rows are bucketed by (product, period code) in a single groupby, and gaps
+    between each product's first and last period are filled as resample does.
     """
-    df = df.copy()
-    df[date_column] = pd.to_datetime(df[date_column])
-    df.set_index(date_column, inplace=True)
+    # Parse only if the loader did not already type the column (no copy otherwise)
+    if not pd.api.types.is_datetime64_any_dtype(df[date_column]):
+        df = df.assign(**{date_column: ensure_datetime(df[date_column])})
+    df = df[df[date_column].notna()]
     
     # Perform aggregation
     agg_dict = {}
     for col, agg_func in aggregations.items():
-        if col in df.columns:
+        if col in df.columns and col != product_column:
             agg_dict[col] = agg_func
     
-    if period == 'weekly':
-        result = df.resample('W').agg(agg_dict)
-    elif period == 'monthly':
-        result = df.resample('M').agg(agg_dict)
-    else:
-        result = df.resample('D').agg(agg_dict)
+    # 'first' and 'last' are taken in date order, as resample does
+    if {'first', 'last'} & set(agg_dict.values()) and not df[date_column].is_monotonic_increasing:
+        df = df.sort_values(date_column, kind='stable')
     
-    result.reset_index(inplace=True)
-    return result
+    keys = {'code': period_codes(df[date_column], period)}
+    if product_column:
+        keys = {'product': df[product_column].to_numpy(), **keys}
+    
+    grouped = df[list(agg_dict)].groupby(
+        [pd.Index(values, name=name) for name, values in keys.items()], observed=True
+    )
+    result = grouped.agg(agg_dict)
+    
+    result[date_column] = period_labels(result.index.get_level_values('code'), period)
+    if product_column:
+        product_values = result.index.get_level_values('product')
+        if isinstance(df[product_column].dtype, pd.CategoricalDtype):
+            product_values = pd.Categorical(product_values, categories=df[product_column].cat.categories)
+        result[product_column] = product_values
+    
+    columns = [date_column] + list(agg_dict) + ([product_column] if product_column else [])
+    result = result.reset_index(drop=True)[columns]
+    return complete_periods(result, date_column, period, agg_dict, product_column)
+
+def _interpolate_by_product(values: pd.DataFrame, product: np.ndarray) -> pd.DataFrame:
+    """
+    Linear interpolation within each product's run of rows (rows are sorted by
+    product then period), trailing gaps padded with the last value as
+    DataFrame.interpolate does. Computed with group-wise ffill/bfill of values
+    and row positions instead of a per-product loop.
+    """
+    position = pd.DataFrame(
+        np.broadcast_to(np.arange(len(values), dtype=float)[:, None], values.shape),
+        index=values.index, columns=values.columns
+    ).where(values.notna())
+    grouped_values = values.groupby(product, sort=False)
+    grouped_position = position.groupby(product, sort=False)
+    
+    prev_value, next_value = grouped_values.ffill(), grouped_values.bfill()
+    prev_position, next_position = grouped_position.ffill(), grouped_position.bfill()
+    here = np.arange(len(values), dtype=float)[:, None]
+    
+    step = (next_value - prev_value) / (next_position - prev_position)
+    interpolated = prev_value + step * (prev_position.rsub(here, axis=0))
+    interpolated = interpolated.where(next_value.notna(), prev_value)
+    return values.fillna(interpolated)
 
 def fill_missing_dates(df: pd.DataFrame, date_column: str, start_date: datetime, end_date: datetime, 
-                       period: str, fill_method: str = 'zero') -> pd.DataFrame:
+                       period: str, fill_method: str = 'zero', product_column: str = None) -> pd.DataFrame:
     """
-    Fill missing dates in dataframe
+    Fill missing dates in dataframe between start_date and end_date,
+    for every product separately when product_column is given
     """
-    df = df.copy()
-    df[date_column] = pd.to_datetime(df[date_column])
-    
-    # Create full date range
-    if period == 'weekly':
-        date_range = pd.date_range(start=start_date, end=end_date, freq='W')
-    elif period == 'monthly':
-        date_range = pd.date_range(start=start_date, end=end_date, freq='M')
-    else:
-        date_range = pd.date_range(start=start_date, end=end_date, freq='D')
+    if not pd.api.types.is_datetime64_any_dtype(df[date_column]):
+        df = df.assign(**{date_column: ensure_datetime(df[date_column])})
+    
+    # Full range of periods (codes) between the main data bounds
+    bounds = period_codes(pd.Series(pd.to_datetime([start_date, end_date])), period)
+    full_codes = np.arange(bounds[0], bounds[1] + 1)
     
-    # Create full dataframe with all dates
-    full_df = pd.DataFrame({date_column: date_range})
+    codes = period_codes(df[date_column], period)
+    value_columns = [col for col in df.columns if col not in (date_column, product_column)]
+    if product_column:
+        products = df[product_column].dropna().unique()
+        full_index = pd.MultiIndex.from_product([products, full_codes])
+        keys = [df[product_column].to_numpy(), codes]
+    else:
+        full_index = pd.Index(full_codes)
+        keys = [codes]
     
-    # Merge with existing data
-    result = pd.merge(full_df, df, on=date_column, how='left')
+    # Periods outside the range are dropped, missing ones inserted as NaN
+    result = df[value_columns].set_index(keys).reindex(full_index).reset_index(drop=True)
+    result[date_column] = period_labels(np.tile(full_codes, len(full_index) // max(len(full_codes), 1)), period)
+    if product_column:
+        product_values = full_index.get_level_values(0)
+        if isinstance(df[product_column].dtype, pd.CategoricalDtype):
+            product_values = pd.Categorical(product_values, categories=df[product_column].cat.categories)
+        result[product_column] = product_values
+    result = result[[date_column] + value_columns + ([product_column] if product_column else [])]
     
     # Fill missing values based on method
     numeric_columns = result.select_dtypes(include=[np.number]).columns
+    values = result[numeric_columns]
+    # Forward/backward fills and means never cross product boundaries
+    grouped = values.groupby(result[product_column].to_numpy(), sort=False) if product_column else values
     
     if fill_method == 'zero':
-        result[numeric_columns] = result[numeric_columns].fillna(0)
+        values = values.fillna(0)
     elif fill_method == 'forward':
-        result[numeric_columns] = result[numeric_columns].fillna(method='ffill')
+        values = grouped.ffill()
     elif fill_method == 'backward':
-        result[numeric_columns] = result[numeric_columns].fillna(method='bfill')
+        values = grouped.bfill()
     elif fill_method == 'mean':
-        for col in numeric_columns:
-            result[col] = result[col].fillna(result[col].mean())
+        values = values.fillna(grouped.transform('mean') if product_column else values.mean())
     elif fill_method == 'interpolate':
-        result[numeric_columns] = result[numeric_columns].interpolate(method='linear')
+        if product_column:
+            values = _interpolate_by_product(values, result[product_column].to_numpy())
+        else:
+            values = values.interpolate(method='linear')
     
     # Fill any remaining NaN with zero
-    result[numeric_columns] = result[numeric_columns].fillna(0)
+    result[numeric_columns] = values.fillna(0)
     
     return result
 
+def _join_keys(df: pd.DataFrame, date_column: str, product_column: str = None) -> pd.Index:
+    """Index of the join keys: period date, or (period date, product)"""
+    if product_column:
+        return pd.MultiIndex.from_arrays([
+            df[date_column].to_numpy(),
+            df[product_column].to_numpy(dtype=object)
+        ])
+    return pd.Index(df[date_column].to_numpy())
+
 def merge_dataframes_horizontal(main_df: pd.DataFrame, additional_dfs: List[Dict], 
                                 date_column: str, product_column: str = None) -> pd.DataFrame:
     """
     Merge main dataframe with additional dataframes horizontally based on date column
-    and optionally product column
+    and optionally product column (a left join on the main rows)
+    
+    Every additional frame is reindexed onto the main frame's keys and all of
+    them are concatenated column-wise at once, instead of merging one by one
+    and copying the growing result for each file.
     
     Args:
         main_df: Main dataframe
@@ -93,175 +186,366 @@ def merge_dataframes_horizontal(main_df: pd.DataFrame, additional_dfs: List[Dict
         date_column: Name of date column for merging
         product_column: Name of product column in main df (optional)
     """
-    result = main_df.copy()
+    main_df = main_df.reset_index(drop=True)
+    main_keys = {}
+    aligned = []
     
     for idx, add_dict in enumerate(additional_dfs):
         add_df = add_dict['df']
         add_product_col = add_dict.get('product_column')
         
+        # Match on both date and product only when both frames have one
+        on_product = bool(product_column and add_product_col)
+        if on_product not in main_keys:
+            main_keys[on_product] = _join_keys(main_df, date_column, product_column if on_product else None)
+        
         # Rename columns to avoid conflicts (except date and product columns)
-        cols_to_keep = [date_column]
-        if add_product_col:
-            cols_to_keep.append(add_product_col)
+        value_columns = [col for col in add_df.columns if col not in (date_column, add_product_col)]
+        add_values = add_df[value_columns].rename(columns={col: f"{col}_add{idx+1}" for col in value_columns})
+        add_values.index = _join_keys(add_df, date_column, add_product_col if on_product else None)
         
-        rename_dict = {
-            col: f"{col}_add{idx+1}" 
-            for col in add_df.columns 
-            if col not in cols_to_keep
-        }
-        add_df_renamed = add_df.rename(columns=rename_dict)
+        add_values = add_values.reindex(main_keys[on_product])
+        add_values.index = main_df.index
+        aligned.append(add_values)
+    
+    return pd.concat([main_df] + aligned, axis=1)
+
+def use_streaming(file_path: str, aggregations: Dict[str, str], streaming: bool = None) -> bool:
+    """
+    Whether to aggregate a file chunk by chunk: forced on/off by the request,
+    otherwise for files above AGGREGATION_STREAMING_THRESHOLD. Only aggregations
+    with mergeable partial states (not median) can be streamed.
+    """
+    if not can_stream(aggregations) or streaming is False:
+        return False
+    return streaming or is_large_file(file_path)
+
+def process_additional_file(spec: Dict[str, Any], date_column: str, period: str,
+                            min_date: datetime, max_date: datetime, streaming: bool = None,
+                            float32: bool = None) -> Dict[str, Any]:
+    """
+    Load, aggregate and gap-fill one additional file described by a plain dict
+    of its column mappings. Runs in a worker thread, so it does not touch the session.
+    Returns dict with 'df' and 'product_column' for merge_dataframes_horizontal.
+    """
+    add_product_column = spec['product_column']
+    
+    # Load only date column, product column and selected columns
+    cols_to_keep = [spec['date_column']] + spec['selected_columns']
+    if add_product_column:
+        cols_to_keep.append(add_product_column)
+    file_dtypes = profile_file(spec['file_path'], spec['file_type'])["dtypes"]
+    numeric_columns = [
+        col for col in spec['selected_columns']
+        if pd.api.types.is_numeric_dtype(file_dtypes.get(col, 'object'))
+    ]
+    
+    # Prepare aggregation dict for additional file (default to mean if not specified)
+    add_agg = {
+        col: spec['column_aggregations'].get(col, 'mean')
+        for col in spec['selected_columns']
+    }
+    
+    add_dtypes = source_dtypes(
+        value_columns=numeric_columns,
+        categorical_columns=[add_product_column] if add_product_column else [],
+        float32=float32
+    )
+    if use_streaming(spec['file_path'], add_agg, streaming):
+        chunks = iter_file_chunks(
+            spec['file_path'],
+            spec['file_type'],
+            columns=cols_to_keep,
+            dtypes=add_dtypes,
+            parse_dates=[spec['date_column']]
+        )
+        add_df_agg = aggregate_chunks(chunks, spec['date_column'], period, add_agg, add_product_column)
+    else:
+        add_df = load_file(
+            spec['file_path'],
+            spec['file_type'],
+            columns=cols_to_keep,
+            dtypes=add_dtypes,
+            parse_dates=[spec['date_column']]
+        )
         
-        # Determine merge columns
-        if product_column and add_product_col:
-            # Merge on both date and product
-            merge_on = [date_column, product_column]
-            
-            # Ensure product columns have same name for merging
-            if add_product_col != product_column:
-                add_df_renamed = add_df_renamed.rename(columns={add_product_col: product_column})
-            
-            result = pd.merge(result, add_df_renamed, on=merge_on, how='left')
-        else:
-            # Merge only on date
-            result = pd.merge(result, add_df_renamed, on=date_column, how='left')
+        # Aggregate additional file
+        add_df_agg = aggregate_to_period(add_df, spec['date_column'], period, add_agg, add_product_column)
     
-    return result
+    # Fill missing dates based on main data range
+    add_df_filled = fill_missing_dates(
+        add_df_agg,
+        spec['date_column'],
+        min_date,
+        max_date,
+        period,
+        spec['fill_method'],
+        add_product_column
+    )
+    
+    # Rename date column to match main file
+    if spec['date_column'] != date_column:
+        add_df_filled = add_df_filled.rename(columns={spec['date_column']: date_column})
+    
+    return {'df': add_df_filled, 'product_column': add_product_column}
 
-@router.post("/projects/{project_id}/aggregate")
-async def aggregate_project_data(
-    project_id: int,
-    config: AggregationConfig,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """Aggregate main and additional files data"""
-    # Verify project ownership
-    project = db.query(Project).filter(
-        Project.id == project_id,
-        Project.user_id == current_user.id
-    ).first()
+def _cached_result(aggregated_data: AggregatedData, date_column: str) -> Dict[str, Any]:
+    """Response of a stored aggregation, in the shape of a fresh one"""
+    stored = read_artifact(aggregated_data, columns=[date_column])
+    dates = stored[date_column].dropna() if date_column in stored.columns else stored.index
+    return {
+        "aggregated_data_id": aggregated_data.id,
+        "period": aggregated_data.period,
+        "row_count": aggregated_data.row_count,
+        "columns": aggregated_data.columns,
+        "sample_data": artifact_sample(aggregated_data, 10),
+        "date_range": {
+            "min": str(dates.min()) if len(dates) else None,
+            "max": str(dates.max()) if len(dates) else None
+        },
+        "incremental": None,
+        "cached": True
+    }
+
+def run_aggregation(job: Job, project_id: int, config: AggregationConfig) -> Dict[str, Any]:
+    """
+    Aggregate main and additional files data and store the result.
+    Runs as a background job with its own session; progress is reported on the job.
+    """
+    db = SessionLocal()
+    try:
+        with MemoryMonitor(effective_budget(config.memory_budget_mb)) as monitor:
+            result = _aggregate(db, job, project_id, config)
+    finally:
+        db.close()
     
+    result["memory"] = monitor.report()
+    return result
+
+def _aggregate(db: Session, job: Job, project_id: int, config: AggregationConfig) -> Dict[str, Any]:
+    project = db.query(Project).filter(Project.id == project_id).first()
     if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
+        raise ValueError("Project not found")
     
-    if not project.date_column or not project.value_column:
-        raise HTTPException(status_code=400, detail="Date and value columns must be set")
+    period_map = {
+        'daily_to_weekly': 'weekly',
+        'daily_to_monthly': 'monthly',
+        'weekly_to_monthly': 'monthly',
+        'daily': 'daily',
+        'weekly': 'weekly',
+        'monthly': 'monthly'
+    }
     
-    try:
-        # Load main file data
-        if project.source_type == "file":
-            if project.file_path.endswith('.csv'):
-                main_df = pd.read_csv(project.file_path)
-            elif project.file_path.endswith(('.xlsx', '.xls')):
-                main_df = pd.read_excel(project.file_path)
-            elif project.file_path.endswith('.json'):
-                main_df = pd.read_json(project.file_path)
-        elif project.source_type == "db":
-            db_conn = db.query(DatabaseConnection).filter(
-                DatabaseConnection.id == project.db_connection_id
-            ).first()
-            connection_url = f"postgresql://{db_conn.username}:{db_conn.password}@{db_conn.host}:{db_conn.port}/{db_conn.database}"
-            query = project.query or f"SELECT * FROM {project.table_name}"
-            main_df = pd.read_sql(query, connection_url)
-        
-        # Prepare aggregation dict for main file
-        main_agg = {project.value_column: config.main_value_aggregation}
-        if project.product_column and project.product_column in main_df.columns:
-            main_agg[project.product_column] = 'first'
-        
-        # Aggregate main file
-        period_map = {
-            'daily_to_weekly': 'weekly',
-            'daily_to_monthly': 'monthly',
-            'weekly_to_monthly': 'monthly',
-            'daily': 'daily',
-            'weekly': 'weekly',
-            'monthly': 'monthly'
-        }
-        
-        target_period = period_map.get(config.period, 'monthly')
-        main_df_agg = aggregate_to_period(main_df, project.date_column, target_period, main_agg)
-        
-        # Get date range from main data
-        main_df_agg[project.date_column] = pd.to_datetime(main_df_agg[project.date_column])
-        min_date = main_df_agg[project.date_column].min()
-        max_date = main_df_agg[project.date_column].max()
-        
-        # Process additional files
-        additional_files = db.query(AdditionalFile).filter(
+    target_period = period_map.get(config.period, 'monthly')
+    
+    # Additional files with mapped columns
+    additional_files = [
+        add_file for add_file in db.query(AdditionalFile).filter(
             AdditionalFile.project_id == project_id
-        ).all()
-        
-        additional_dfs = []
-        for add_file in additional_files:
-            # Skip if columns not mapped
-            if not add_file.date_column or not add_file.selected_columns:
-                continue
-            
-            # Load additional file
-            file_path = Path(add_file.file_path)
-            if add_file.file_type == 'csv':
-                add_df = pd.read_csv(file_path)
-            elif add_file.file_type == 'json':
-                add_df = pd.read_json(file_path)
-            elif add_file.file_type in ['xlsx', 'xls']:
-                add_df = pd.read_excel(file_path)
-            
-            # Keep only date column and selected columns
-            cols_to_keep = [add_file.date_column] + add_file.selected_columns
-            add_df = add_df[cols_to_keep]
-            
-            # Prepare aggregation dict for additional file
-            add_agg = {}
-            if add_file.column_aggregations:
-                for col in add_file.selected_columns:
-                    agg_func = add_file.column_aggregations.get(col, 'mean')
-                    add_agg[col] = agg_func
-            else:
-                # Default to mean if not specified
-                for col in add_file.selected_columns:
-                    add_agg[col] = 'mean'
-            
-            # Aggregate additional file
-            add_df_agg = aggregate_to_period(add_df, add_file.date_column, target_period, add_agg)
-            
-            # Fill missing dates based on main data range
-            add_df_filled = fill_missing_dates(
-                add_df_agg, 
-                add_file.date_column, 
-                min_date, 
-                max_date, 
+        ).order_by(AdditionalFile.id).all()
+        if add_file.date_column and add_file.selected_columns
+    ]
+    
+    external_engine = None
+    if project.source_type == "db":
+        db_conn = db.query(DatabaseConnection).filter(
+            DatabaseConnection.id == project.db_connection_id
+        ).first()
+        external_engine = engine_registry.get(db_conn)
+    
+    # Return the stored result when nothing it depends on has changed. Without
+    # the cache no key is computed (for databases it costs a query over the source)
+    cache_key = None
+    if config.use_cache:
+        job.report(0.02, "Checking cache")
+        cache_key = aggregation_cache_key(project, config, additional_files, external_engine)
+        cached = db.query(AggregatedData).filter(
+            AggregatedData.project_id == project_id,
+            AggregatedData.cache_key == cache_key
+        ).first()
+        aggregation_cache_stats.record(hit=cached is not None)
+        if cached is not None:
+            project.aggregation_period = cached.period
+            project.aggregation_completed = True
+            db.commit()
+            return _cached_result(cached, project.date_column)
+    
+    # Load main file data
+    job.report(0.05, "Loading main data")
+    # With a memory budget, values are loaded as float32 and the result is downcast
+    lean = effective_budget(config.memory_budget_mb) is not None
+    # Only the mapped columns are read, with explicit dtypes and dates parsed once
+    main_dtypes = source_dtypes(
+        value_columns=[project.value_column],
+        categorical_columns=[project.product_column] if project.product_column else [],
+        float32=True if lean else None
+    )
+    main_df_agg = None
+    incremental_run = None
+    value_agg = {project.value_column: config.main_value_aggregation}
+    if config.incremental and supports_incremental(project, value_agg):
+        # Only rows appended since the last incremental run are read
+        if project.source_type == "file":
+            available_columns = profile_file(project.file_path)["columns"]
+        else:
+            available_columns = None
+        main_columns = [
+            col for col in [project.date_column, project.value_column, project.product_column]
+            if col and (available_columns is None or col in available_columns)
+        ]
+        main_df_agg, incremental_run = aggregate_incremental(
+            db, project, target_period, value_agg, main_columns, main_dtypes, external_engine
+        )
+        main_df_agg = apply_dtypes(main_df_agg, main_dtypes)
+    elif project.source_type == "file":
+        available_columns = profile_file(project.file_path)["columns"]
+        main_columns = [
+            col for col in [project.date_column, project.value_column, project.product_column]
+            if col and col in available_columns
+        ]
+        if use_streaming(project.file_path, value_agg, config.streaming):
+            # Out-of-core: only one chunk and the running partial aggregates are in memory
+            chunks = iter_file_chunks(
+                project.file_path,
+                columns=main_columns,
+                dtypes=main_dtypes,
+                parse_dates=[project.date_column]
+            )
+            product_column = project.product_column if project.product_column in main_columns else None
+            main_df_agg = aggregate_chunks(
+                chunks, project.date_column, target_period, value_agg, product_column
+            )
+            main_df_agg = apply_dtypes(main_df_agg, main_dtypes)
+        else:
+            main_df = load_file(
+                project.file_path,
+                columns=main_columns,
+                dtypes=main_dtypes,
+                parse_dates=[project.date_column]
+            )
+    elif project.source_type == "db":
+        # Let Postgres aggregate when it can express the aggregation function
+        pushdown_query = build_aggregation_query(
+            project.table_name,
+            project.query,
+            project.date_column,
+            project.value_column,
+            target_period,
+            config.main_value_aggregation,
+            project.product_column
+        )
+        if pushdown_query is not None:
+            main_df_agg = pd.read_sql(pushdown_query, external_engine, parse_dates=[project.date_column])
+            main_df_agg = apply_dtypes(main_df_agg, main_dtypes)
+            main_df_agg = complete_periods(
+                main_df_agg,
+                project.date_column,
                 target_period,
-                add_file.fill_method
+                {project.value_column: config.main_value_aggregation},
+                project.product_column
             )
-            
-            # Rename date column to match main file
-            if add_file.date_column != project.date_column:
-                add_df_filled = add_df_filled.rename(columns={add_file.date_column: project.date_column})
-            
-            additional_dfs.append(add_df_filled)
-        
-        # Merge all dataframes horizontally
-        if additional_dfs:
-            final_df = merge_dataframes_horizontal(main_df_agg, additional_dfs, project.date_column)
         else:
-            final_df = main_df_agg
-        
-        # Clean up: remove any rows with NaN in critical columns
-        final_df = final_df.dropna(subset=[project.date_column])
-        
-        # Convert to JSON for storage
-        data_json = final_df.to_dict('records')
+            main_columns = [
+                col for col in [project.date_column, project.value_column, project.product_column]
+                if col
+            ]
+            if can_stream(value_agg):
+                # Stream through a server-side cursor into mergeable partial aggregates
+                chunks = iter_query_chunks(
+                    external_engine,
+                    table_name=project.table_name,
+                    query=project.query,
+                    columns=main_columns,
+                    dtypes=main_dtypes,
+                    parse_dates=[project.date_column]
+                )
+                main_df_agg = aggregate_chunks(
+                    chunks, project.date_column, target_period, value_agg, project.product_column
+                )
+                main_df_agg = apply_dtypes(main_df_agg, main_dtypes)
+            else:
+                main_df = load_query(
+                    external_engine,
+                    table_name=project.table_name,
+                    query=project.query,
+                    columns=main_columns,
+                    dtypes=main_dtypes,
+                    parse_dates=[project.date_column]
+                )
+    
+    if main_df_agg is None:
+        # Prepare aggregation dict for main file
+        main_agg = {project.value_column: config.main_value_aggregation}
+        product_column = project.product_column if project.product_column in main_df.columns else None
         
-        # Delete previous aggregated data if exists
+        # Aggregate main file (one series per product)
+        main_df_agg = aggregate_to_period(
+            main_df, project.date_column, target_period, main_agg, product_column
+        )
+    
+    product_column = project.product_column if project.product_column in main_df_agg.columns else None
+    
+    # Get date range from main data (date column is already datetime64)
+    min_date = main_df_agg[project.date_column].min()
+    max_date = main_df_agg[project.date_column].max()
+    
+    # Process additional files
+    job.report(0.4, "Aggregating additional files")
+    # Plain copies of the mappings: ORM objects are not shared with worker threads
+    file_specs = [
+        {
+            'file_path': add_file.file_path,
+            'file_type': add_file.file_type,
+            'date_column': add_file.date_column,
+            'product_column': add_file.product_column if product_column else None,
+            'selected_columns': list(add_file.selected_columns),
+            'column_aggregations': dict(add_file.column_aggregations or {}),
+            'fill_method': add_file.fill_method
+        }
+        for add_file in additional_files
+    ]
+    
+    # Load, aggregate and fill the files concurrently; map keeps the files' order
+    date_column = project.date_column
+    additional_dfs = list(_file_executor.map(
+        lambda spec: process_additional_file(
+            spec, date_column, target_period, min_date, max_date, config.streaming,
+            True if lean else None
+        ),
+        file_specs
+    ))
+    
+    # Merge all dataframes horizontally
+    job.report(0.8, "Merging")
+    if additional_dfs:
+        final_df = merge_dataframes_horizontal(
+            main_df_agg, additional_dfs, project.date_column, product_column
+        )
+    else:
+        final_df = main_df_agg
+    
+    # Clean up: remove any rows with NaN in critical columns
+    final_df = final_df.dropna(subset=[project.date_column])
+    if lean:
+        final_df = downcast_frame(final_df, exclude=[project.date_column])
+    
+    # Store the frame as Parquet; the row keeps only metadata and the file path
+    job.report(0.9, "Saving")
+    artifact_path, artifact_size = write_artifact(final_df, AGGREGATED_ARTIFACTS, project_id)
+    try:
+        # Delete previous aggregated data if exists (files once the new row is committed)
+        previous_paths = [path for (path,) in db.query(AggregatedData.artifact_path).filter(
+            AggregatedData.project_id == project_id
+        )]
         db.query(AggregatedData).filter(
             AggregatedData.project_id == project_id
         ).delete()
         
-        # Save aggregated data to database
         aggregated_data = AggregatedData(
             project_id=project_id,
-            data=data_json,
+            cache_key=cache_key,
+            artifact_path=artifact_path,
+            artifact_size=artifact_size,
             period=target_period,
             row_count=len(final_df),
             columns=final_df.columns.tolist()
@@ -274,25 +558,109 @@ async def aggregate_project_data(
         project.aggregation_completed = True
         
         db.commit()
-        db.refresh(aggregated_data)
-        
-        return {
-            "aggregated_data_id": aggregated_data.id,
-            "period": target_period,
-            "row_count": len(final_df),
-            "columns": final_df.columns.tolist(),
-            "sample_data": final_df.head(10).to_dict('records'),
-            "date_range": {
-                "min": str(min_date),
-                "max": str(max_date)
-            }
-        }
-        
-    except Exception as e:
+    except Exception:
+        db.rollback()
+        delete_artifacts([artifact_path])
+        raise
+    
+    delete_artifacts(previous_paths)
+    db.refresh(aggregated_data)
+    
+    return {
+        "aggregated_data_id": aggregated_data.id,
+        "period": target_period,
+        "row_count": len(final_df),
+        "columns": final_df.columns.tolist(),
+        "sample_data": final_df.head(10).to_dict('records'),
+        "date_range": {
+            "min": str(min_date),
+            "max": str(max_date)
+        },
+        "incremental": incremental_run,
+        "cached": False
+    }
+
+def submit_aggregation(project_id: int, config: AggregationConfig, current_user: User, db: Session) -> Job:
+    """
+    Validate the project and start its aggregation job.
+    While a job for the project is queued or running, that job is returned
+    instead (409 if it was started with different settings).
+    """
+    # Verify project ownership
+    project = db.query(Project).filter(
+        Project.id == project_id,
+        Project.user_id == current_user.id
+    ).first()
+    
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    
+    if not project.date_column or not project.value_column:
+        raise HTTPException(status_code=400, detail="Date and value columns must be set")
+    
+    # A second submit with the same settings (e.g. a double click) joins the running job
+    try:
+        return job_manager.submit(
+            'aggregation', project_id, run_aggregation, project_id, config,
+            user_id=current_user.id, params=config.model_dump()
+        )
+    except JobConflict as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Aggregation with different settings is already running (job {e.job.id})"
+        )
+
+@router.post("/projects/{project_id}/aggregate")
+def aggregate_project_data(
+    project_id: int,
+    config: AggregationConfig,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Aggregate main and additional files data, waiting for the aggregation job to finish.
+    After JOB_WAIT_TIMEOUT seconds the job is returned with status 202 to be polled instead.
+    """
+    job = submit_aggregation(project_id, config, current_user, db)
+    if not job.wait(settings.JOB_WAIT_TIMEOUT):
+        return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content=jsonable_encoder(job.to_dict()))
+    
+    if job.status == 'failed':
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Error aggregating data: {str(e)}"
+            detail=f"Error aggregating data: {job.error}"
         )
+    
+    return job.result
+
+@router.post("/projects/{project_id}/aggregation-jobs", response_model=JobResponse,
+             status_code=status.HTTP_202_ACCEPTED)
+def start_aggregation_job(
+    project_id: int,
+    config: AggregationConfig,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Start aggregation in the background and return the job to poll"""
+    return submit_aggregation(project_id, config, current_user, db).to_dict()
+
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+def get_aggregation_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """Status, progress and (when completed) result of an aggregation job"""
+    job = job_manager.get(job_id)
+    
+    if not job or job.user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return job.to_dict()
+
+@router.get("/cache-stats")
+def get_aggregation_cache_stats(current_user: User = Depends(get_current_user)):
+    """Hit/miss counts of the aggregation result cache since the server started"""
+    return aggregation_cache_stats.snapshot()
 
 @router.get("/projects/{project_id}/aggregated-data")
 def get_aggregated_data(
@@ -318,8 +686,7 @@ def get_aggregated_data(
         raise HTTPException(status_code=404, detail="No aggregated data found")
     
     # Return sample of data
-    sample_size = min(20, aggregated_data.row_count)
-    sample_data = aggregated_data.data[:sample_size] if aggregated_data.data else []
+    sample_data = artifact_sample(aggregated_data, min(20, aggregated_data.row_count or 0))
     
     return {
         "id": aggregated_data.id,
@@ -327,10 +694,52 @@ def get_aggregated_data(
         "period": aggregated_data.period,
         "row_count": aggregated_data.row_count,
         "columns": aggregated_data.columns,
+        "artifact_size": aggregated_data.artifact_size,
         "sample_data": sample_data,
         "created_at": aggregated_data.created_at
     }
 
+@router.get("/projects/{project_id}/aggregated-data/rows", response_model=DataPageResponse)
+def get_aggregated_data_rows(
+    project_id: int,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=settings.ARTIFACT_PAGE_MAX_ROWS),
+    columns: Optional[List[str]] = Query(None),
+    date_from: Optional[Union[datetime, date]] = None,
+    date_to: Optional[Union[datetime, date]] = None,
+    products: Optional[List[str]] = Query(None),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Page through the aggregated data, optionally within a date range, for some
+    products and only some columns. Only the rows of the page are read.
+    """
+    # Verify project ownership
+    project = db.query(Project).filter(
+        Project.id == project_id,
+        Project.user_id == current_user.id
+    ).first()
+    
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    
+    aggregated_data = db.query(AggregatedData).filter(
+        AggregatedData.project_id == project_id
+    ).first()
+    
+    if not aggregated_data:
+        raise HTTPException(status_code=404, detail="No aggregated data found")
+    
+    try:
+        return artifact_page(
+            aggregated_data, offset, limit, columns,
+            date_column=project.date_column, date_from=date_from, date_to=date_to,
+            product_column=project.product_column, products=products
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.delete("/projects/{project_id}/aggregated-data")
 def delete_aggregated_data(
     project_id: int,
@@ -348,6 +757,9 @@ def delete_aggregated_data(
         raise HTTPException(status_code=404, detail="Project not found")
     
     # Delete aggregated data
+    artifact_paths = [path for (path,) in db.query(AggregatedData.artifact_path).filter(
+        AggregatedData.project_id == project_id
+    )]
     deleted_count = db.query(AggregatedData).filter(
         AggregatedData.project_id == project_id
     ).delete()
@@ -356,5 +768,6 @@ def delete_aggregated_data(
     project.aggregation_completed = False
     
     db.commit()
+    delete_artifacts(artifact_paths)
     
     return {"message": f"Deleted {deleted_count} aggregated data record(s)"}
\ No newline at end of file
@@ -1,11 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, BackgroundTasks
 from sqlalchemy.orm import Session
-from sqlalchemy import create_engine, text
 import pandas as pd
 import json
 from pathlib import Path
 from typing import List
-import uuid
 
 from database import get_db
 from models import User, Project, DatabaseConnection
@@ -14,12 +12,17 @@ from schemas import (
     DataSourceInfo, ProjectCreate, Project as ProjectSchema, ProjectUpdate
 )
 from routers.auth import get_current_user
-from config import settings
+from file_storage import store_upload
+from db_engines import engine_registry, check_connection
+from db_metadata import list_tables, get_table_columns, estimate_row_count, request_exact_count
+from file_profiler import profile_file
+from data_loader import ensure_columnar
 
 router = APIRouter()
 
 @router.post("/upload-file")
 async def upload_file(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -34,47 +37,31 @@ async def upload_file(
             detail=f"File type not supported. Allowed types: {', '.join(allowed_extensions)}"
         )
     
-    # Create unique filename
-    unique_filename = f"{uuid.uuid4()}{file_extension}"
-    file_path = Path(settings.UPLOAD_DIR) / unique_filename
+    # Stream file to the store (identical files are kept once), enforcing the size limit as it arrives
+    file_path, file_size, file_hash = await store_upload(file, file_extension, db, current_user.id)
     
-    # Save file
-    with open(file_path, "wb") as buffer:
-        content = await file.read()
-        if len(content) > settings.MAX_FILE_SIZE:
-            raise HTTPException(
-                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-                detail="File too large"
-            )
-        buffer.write(content)
-    
-    # Read and analyze file
+    # Profile file (header, sample rows and row count only)
     try:
-        if file_extension == '.csv':
-            df = pd.read_csv(file_path)
-        elif file_extension == '.json':
-            df = pd.read_json(file_path)
-        elif file_extension in ['.xlsx', '.xls']:
-            df = pd.read_excel(file_path)
+        profile = profile_file(file_path, file_extension[1:])
         
-        # Get file info
-        columns = df.columns.tolist()
-        row_count = len(df)
-        sample_data = df.head(5).to_dict('records')
+        # Convert to the columnar cache after the response is sent
+        background_tasks.add_task(ensure_columnar, file_path, file_extension[1:])
         
         return {
             "file_path": str(file_path),
+            "file_size": file_size,
+            "file_hash": file_hash,
             "source_info": {
                 "source_type": "file",
-                "columns": columns,
-                "row_count": row_count,
-                "sample_data": sample_data
+                "columns": profile["columns"],
+                "row_count": profile["row_count"],
+                "dtypes": profile["dtypes"],
+                "sample_data": profile["sample_data"]
             }
         }
         
     except Exception as e:
-        # Clean up file if processing failed
-        file_path.unlink(missing_ok=True)
+        # The stored file may be shared: unused, it is removed by collect_unreferenced_uploads
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Error processing file: {str(e)}"
@@ -83,14 +70,8 @@ async def upload_file(
 @router.post("/test-db-connection")
 def test_db_connection(connection: DatabaseConnectionTest):
     try:
-        # Create connection string
-        connection_url = f"postgresql://{connection.username}:{connection.password}@{connection.host}:{connection.port}/{connection.database}"
-        
-        # Test connection
-        engine = create_engine(connection_url)
-        with engine.connect() as conn:
-            result = conn.execute(text("SELECT 1"))
-            result.fetchone()
+        # Test connection over a one-off engine (nothing to cache before it is saved)
+        check_connection(connection)
         
         return {"success": True, "message": "Connection successful"}
         
@@ -108,10 +89,7 @@ def create_db_connection(
 ):
     # Test connection first
     try:
-        connection_url = f"postgresql://{connection.username}:{connection.password}@{connection.host}:{connection.port}/{connection.database}"
-        engine = create_engine(connection_url)
-        with engine.connect() as conn:
-            conn.execute(text("SELECT 1"))
+        check_connection(connection)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -145,6 +123,7 @@ def get_db_connections(
 @router.get("/db-connections/{connection_id}/tables")
 def get_db_tables(
     connection_id: int,
+    refresh: bool = False,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -158,17 +137,8 @@ def get_db_tables(
         raise HTTPException(status_code=404, detail="Connection not found")
     
     try:
-        connection_url = f"postgresql://{db_connection.username}:{db_connection.password}@{db_connection.host}:{db_connection.port}/{db_connection.database}"
-        engine = create_engine(connection_url)
-        
-        with engine.connect() as conn:
-            result = conn.execute(text("""
-                SELECT tablename 
-                FROM pg_tables 
-                WHERE schemaname = 'public'
-                ORDER BY tablename
-            """))
-            tables = [row[0] for row in result]
+        # Cached per connection for EXTERNAL_DB_METADATA_TTL seconds
+        tables = list_tables(db_connection, refresh=refresh)
         
         return {"tables": tables}
         
@@ -182,6 +152,7 @@ def get_db_tables(
 def preview_db_table(
     connection_id: int,
     table_name: str,
+    exact_count: bool = False,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -195,22 +166,28 @@ def preview_db_table(
         raise HTTPException(status_code=404, detail="Connection not found")
     
     try:
-        connection_url = f"postgresql://{db_connection.username}:{db_connection.password}@{db_connection.host}:{db_connection.port}/{db_connection.database}"
-        
-        # Get table info using pandas
-        df = pd.read_sql(f"SELECT * FROM {table_name} LIMIT 5", connection_url)
+        engine = engine_registry.get(db_connection)
         
-        # Get total count
-        engine = create_engine(connection_url)
         with engine.connect() as conn:
-            result = conn.execute(text(f"SELECT COUNT(*) FROM {table_name}"))
-            row_count = result.fetchone()[0]
+            # Get table info using pandas
+            df = pd.read_sql(f"SELECT * FROM {table_name} LIMIT 5", conn)
+        
+        # Estimated count from table statistics; exact count only on request, computed in background
+        row_count = estimate_row_count(db_connection, table_name)
+        exact_count_state = request_exact_count(db_connection, table_name) if exact_count else None
+        if exact_count_state and exact_count_state["status"] == "done":
+            row_count = exact_count_state["row_count"]
         
         return {
             "source_info": {
                 "source_type": "db",
                 "columns": df.columns.tolist(),
+                "column_types": {
+                    col["name"]: col["type"] for col in get_table_columns(db_connection, table_name)
+                },
                 "row_count": row_count,
+                "row_count_estimated": not (exact_count_state and exact_count_state["status"] == "done"),
+                "exact_count_status": exact_count_state["status"] if exact_count_state else None,
                 "sample_data": df.to_dict('records')
             }
         }
@@ -219,4 +196,37 @@ def preview_db_table(
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Error previewing table: {str(e)}"
+        )
+
+@router.get("/db-connections/{connection_id}/tables/{table_name}/count")
+def get_db_table_count(
+    connection_id: int,
+    table_name: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Exact row count of a table, computed asynchronously (poll until status is 'done')"""
+    # Get connection
+    db_connection = db.query(DatabaseConnection).filter(
+        DatabaseConnection.id == connection_id,
+        DatabaseConnection.user_id == current_user.id
+    ).first()
+    
+    if not db_connection:
+        raise HTTPException(status_code=404, detail="Connection not found")
+    
+    try:
+        state = request_exact_count(db_connection, table_name)
+        return {
+            "table_name": table_name,
+            "status": state["status"],
+            "row_count": state.get("row_count"),
+            "estimated_row_count": estimate_row_count(db_connection, table_name),
+            "error": state.get("error")
+        }
+        
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Error counting rows: {str(e)}"
         )
\ No newline at end of file
@@ -1,95 +1,114 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session, undefer
 import pandas as pd
 import numpy as np
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Union
+from datetime import date, datetime
 
-from database import get_db
+from config import settings
+from database import get_db, engine
 from models import User, Project, AggregatedData, GeneratedFeatures
-from schemas import DateFeatures, NumericalFeatures, ProjectUpdate
+from schemas import DateFeatures, NumericalFeatures, ProjectUpdate, DataPageResponse
 from routers.auth import get_current_user
+from data_loader import ensure_datetime
+from memory_budget import MemoryMonitor, effective_budget, downcast_frame
+from artifacts import (
+    AGGREGATED_ARTIFACTS, FEATURE_ARTIFACTS, write_artifact, read_artifact, artifact_sample, artifact_page, delete_artifacts
+)
+from table_export import export_table_name, export_to_table
+from calendar_index import HOLIDAY_KINDS, calendar_lookup, holidays_in_period, periods_until_holiday
 
 router = APIRouter()
 
-def generate_date_features(df: pd.DataFrame, date_column: str, features: DateFeatures) -> pd.DataFrame:
-    """Generate date-based features"""
-    df = df.copy()
-    df[date_column] = pd.to_datetime(df[date_column])
-    
-    if features.month:
-        df['date_month'] = df[date_column].dt.month
-    
-    if features.year:
-        df['date_year'] = df[date_column].dt.year
-    
-    if features.quarter:
-        df['date_quarter'] = df[date_column].dt.quarter
-    
-    if features.month_sin:
-        df['date_month_sin'] = np.sin(2 * np.pi * df[date_column].dt.month / 12)
-    
-    if features.month_cos:
-        df['date_month_cos'] = np.cos(2 * np.pi * df[date_column].dt.month / 12)
-    
-    if features.quarter_sin:
-        df['date_quarter_sin'] = np.sin(2 * np.pi * df[date_column].dt.quarter / 4)
-    
-    if features.quarter_cos:
-        df['date_quarter_cos'] = np.cos(2 * np.pi * df[date_column].dt.quarter / 4)
-    
-    # Holiday features (simplified - you can expand these)
-    if features.number_of_holidays_governmental:
-        df['date_number_of_holidays_governmental'] = 0
+# Date features read from the calendar table: feature -> calendar column
+CALENDAR_FEATURES = {
+    'month': 'month',
+    'year': 'year',
+    'quarter': 'quarter',
+    'month_sin': 'month_sin',
+    'month_cos': 'month_cos',
+    'quarter_sin': 'quarter_sin',
+    'quarter_cos': 'quarter_cos'
+}
+
+def generate_date_features(df: pd.DataFrame, date_column: str, features: DateFeatures,
+                           period: str = 'daily') -> pd.DataFrame:
+    """
+    Generate date-based features (added to df in place, which is returned).
+    Values are looked up in the calendar table once per distinct date and
+    gathered for all rows; holiday features count per aggregation period.
+    """
+    df[date_column] = ensure_datetime(df[date_column], 'ISO8601')
+    codes, dates = pd.factorize(df[date_column])
+    missing = codes < 0
     
-    if features.number_of_holidays_religious:
-        df['date_number_of_holidays_religious'] = 0
+    def gather(values: np.ndarray) -> np.ndarray:
+        values = values[codes]
+        return np.where(missing, np.nan, values) if missing.any() else values
     
-    if features.periods_until_next_governmental_holiday:
-        df['date_periods_until_next_governmental_holiday'] = 0
+    for feature, column in CALENDAR_FEATURES.items():
+        if getattr(features, feature):
+            df[f'date_{feature}'] = gather(calendar_lookup(dates, column))
     
-    if features.periods_until_next_religious_holiday:
-        df['date_periods_until_next_religious_holiday'] = 0
+    for kind in HOLIDAY_KINDS:
+        if getattr(features, f'number_of_holidays_{kind}'):
+            df[f'date_number_of_holidays_{kind}'] = gather(holidays_in_period(dates, period, kind))
+        if getattr(features, f'periods_until_next_{kind}_holiday'):
+            df[f'date_periods_until_next_{kind}_holiday'] = gather(periods_until_holiday(dates, period, kind))
     
+    # Ramadan dates follow the lunar calendar and are not in the calendar table yet
     if features.number_of_ramadan_days_in_month:
         df['date_number_of_ramadan_days_in_month'] = 0
     
     return df
 
-def generate_numerical_features(df: pd.DataFrame, value_columns: List[str], features: NumericalFeatures) -> pd.DataFrame:
-    """Generate numerical features for all value columns"""
-    df = df.copy()
+def generate_numerical_features(df: pd.DataFrame, value_columns: List[str], features: NumericalFeatures,
+                                product_column: str = None) -> pd.DataFrame:
+    """
+    Generate numerical features for all value columns (added to df in place, which is returned).
+    With a product column, rows must be sorted by product then date: every
+    feature is computed within each product's series, so none reaches across products.
+    """
+    products = df[product_column].to_numpy() if product_column else None
+    
+    def ungroup(result: pd.Series) -> pd.Series:
+        # Grouped rolling results are indexed by (product, row); align them back on the row
+        return result.droplevel(0) if products is not None else result
     
     for value_column in value_columns:
-        if value_column not in df.columns:
+        if value_column not in df.columns or value_column == product_column:
             continue
         
         # Create prefix based on column name
         prefix = value_column.replace(' ', '_').lower()
+        values = df[value_column]
+        series = values.groupby(products, sort=False) if products is not None else values
         
         # Lag features
         for lag in features.lag_periods:
-            df[f'{prefix}_lag_{lag}'] = df[value_column].shift(lag)
+            df[f'{prefix}_lag_{lag}'] = series.shift(lag)
         
         # Rolling window features
         for window in features.rolling_windows:
+            rolling = series.rolling(window=window)
             if features.include_statistics:
-                df[f'{prefix}_rolling_{window}_mean'] = df[value_column].rolling(window=window).mean()
-                df[f'{prefix}_rolling_{window}_std'] = df[value_column].rolling(window=window).std()
-                df[f'{prefix}_rolling_{window}_min'] = df[value_column].rolling(window=window).min()
-                df[f'{prefix}_rolling_{window}_max'] = df[value_column].rolling(window=window).max()
+                df[f'{prefix}_rolling_{window}_mean'] = ungroup(rolling.mean())
+                df[f'{prefix}_rolling_{window}_std'] = ungroup(rolling.std())
+                df[f'{prefix}_rolling_{window}_min'] = ungroup(rolling.min())
+                df[f'{prefix}_rolling_{window}_max'] = ungroup(rolling.max())
             else:
-                df[f'{prefix}_rolling_{window}'] = df[value_column].rolling(window=window).mean()
+                df[f'{prefix}_rolling_{window}'] = ungroup(rolling.mean())
         
         # Trend features
         if features.include_trend_features:
             for period in features.trend_periods:
-                df[f'{prefix}_trend_{period}'] = df[value_column].rolling(window=period).apply(
+                df[f'{prefix}_trend_{period}'] = ungroup(series.rolling(window=period).apply(
                     lambda x: np.polyfit(range(len(x)), x, 1)[0] if len(x) == period else np.nan
-                )
+                ))
         
         # Change features
         for period in features.change_periods:
-            df[f'{prefix}_change_{period}'] = df[value_column].pct_change(periods=period)
+            df[f'{prefix}_change_{period}'] = series.pct_change(periods=period)
     
     return df
 
@@ -98,10 +117,14 @@ def generate_features(
     project_id: int,
     date_features: DateFeatures,
     numerical_features: NumericalFeatures,
+    memory_budget_mb: Optional[int] = None,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Generate features from aggregated data"""
+    """
+    Generate features from aggregated data.
+    With a memory budget (memory_budget_mb or MEMORY_BUDGET_MB) frames are downcast.
+    """
     # Get project
     project = db.query(Project).filter(
         Project.id == project_id,
@@ -114,88 +137,113 @@ def generate_features(
     if not project.aggregation_completed:
         raise HTTPException(status_code=400, detail="Data aggregation must be completed first")
     
-    # Get aggregated data
-    aggregated_data = db.query(AggregatedData).filter(
+    # Get aggregated data (with the legacy JSON rows, which are deferred otherwise)
+    aggregated_data = db.query(AggregatedData).options(undefer(AggregatedData.data)).filter(
         AggregatedData.project_id == project_id
     ).first()
     
     if not aggregated_data:
         raise HTTPException(status_code=404, detail="No aggregated data found")
     
-    try:
-        # Load aggregated data into DataFrame
-        df = pd.DataFrame(aggregated_data.data)
-        
-        # Generate date features
-        if project.date_column:
-            df = generate_date_features(df, project.date_column, date_features)
-        
-        # Identify all numeric columns for feature generation
-        numeric_columns = df.select_dtypes(include=[np.number]).columns.tolist()
-        
-        # Remove date-related columns from numeric processing
-        date_feature_cols = [col for col in df.columns if col.startswith('date_')]
-        numeric_columns = [col for col in numeric_columns if col not in date_feature_cols]
-        
-        # Generate numerical features for all numeric columns
-        if numeric_columns and (numerical_features.lag_periods or numerical_features.rolling_windows or 
-                               numerical_features.trend_periods or numerical_features.change_periods):
-            df = generate_numerical_features(df, numeric_columns, numerical_features)
-        
-        # Remove rows with NaN values created by lag/rolling features
-        df = df.dropna()
-        
-        # Convert to JSON for storage with _gf prefix logic
-        data_json = df.to_dict('records')
-        
-        # Delete previous generated features if exists
-        db.query(GeneratedFeatures).filter(
-            GeneratedFeatures.project_id == project_id
-        ).delete()
-        
-        # Save generated features to database
-        generated_features = GeneratedFeatures(
-            project_id=project_id,
-            data=data_json,
-            row_count=len(df),
-            columns=df.columns.tolist(),
-            feature_config={
-                'date_features': date_features.dict(),
-                'numerical_features': numerical_features.dict()
+    budget_mb = effective_budget(memory_budget_mb)
+    with MemoryMonitor(budget_mb) as monitor:
+        try:
+            # Load aggregated data into DataFrame (owned here, so helpers work in place)
+            df = read_artifact(aggregated_data)
+            if budget_mb is not None:
+                df = downcast_frame(df, exclude=[project.date_column])
+            
+            # Generate date features
+            if project.date_column:
+                df = generate_date_features(
+                    df, project.date_column, date_features, aggregated_data.period or 'daily'
+                )
+            
+            # One series per product: lags and windows run over each product's rows in date order
+            product_column = project.product_column if project.product_column in df.columns else None
+            if product_column:
+                sort_keys = [product_column] + ([project.date_column] if project.date_column in df.columns else [])
+                df = df.sort_values(sort_keys, kind='stable', ignore_index=True)
+            
+            # Identify all numeric columns for feature generation
+            numeric_columns = df.select_dtypes(include=[np.number]).columns.tolist()
+            
+            # Remove date-related columns (and a numeric product id) from numeric processing
+            date_feature_cols = [col for col in df.columns if col.startswith('date_')]
+            numeric_columns = [col for col in numeric_columns if col not in date_feature_cols and col != product_column]
+            
+            # Generate numerical features for all numeric columns
+            if numeric_columns and (numerical_features.lag_periods or numerical_features.rolling_windows or 
+                                   numerical_features.trend_periods or numerical_features.change_periods):
+                df = generate_numerical_features(df, numeric_columns, numerical_features, product_column)
+            
+            # Remove rows with NaN values created by lag/rolling features
+            df = df.dropna()
+            if budget_mb is not None:
+                df = downcast_frame(df, exclude=[project.date_column])
+            
+            # Store the frame as Parquet; the row keeps only metadata and the file path
+            artifact_path, artifact_size = write_artifact(df, FEATURE_ARTIFACTS, project_id)
+            try:
+                # Delete previous generated features if exists (files once the new row is committed)
+                previous_paths = [path for (path,) in db.query(GeneratedFeatures.artifact_path).filter(
+                    GeneratedFeatures.project_id == project_id
+                )]
+                db.query(GeneratedFeatures).filter(
+                    GeneratedFeatures.project_id == project_id
+                ).delete()
+                
+                # Save generated features to database
+                generated_features = GeneratedFeatures(
+                    project_id=project_id,
+                    artifact_path=artifact_path,
+                    artifact_size=artifact_size,
+                    row_count=len(df),
+                    columns=df.columns.tolist(),
+                    feature_config={
+                        'date_features': date_features.dict(),
+                        'numerical_features': numerical_features.dict()
+                    }
+                )
+                
+                db.add(generated_features)
+                
+                # Update project with feature settings
+                project.date_features = date_features.dict()
+                project.numerical_features = numerical_features.dict()
+                project.features_generated = True
+                
+                db.commit()
+            except Exception:
+                db.rollback()
+                delete_artifacts([artifact_path])
+                raise
+            
+            delete_artifacts(previous_paths)
+            db.refresh(generated_features)
+            
+            # Get feature categories
+            new_date_features = [col for col in df.columns if col.startswith('date_') and col != project.date_column]
+            new_numeric_features = [col for col in df.columns if any(
+                suffix in col for suffix in ['_lag_', '_rolling_', '_trend_', '_change_']
+            )]
+            
+            return {
+                "generated_features_id": generated_features.id,
+                "total_features": len(df.columns),
+                "row_count": len(df),
+                "columns": df.columns.tolist(),
+                "new_date_features": new_date_features,
+                "new_numeric_features": new_numeric_features,
+                "sample_data": df.head(5).to_dict('records'),
+                "memory": monitor.report()
             }
-        )
-        
-        db.add(generated_features)
-        
-        # Update project with feature settings
-        project.date_features = date_features.dict()
-        project.numerical_features = numerical_features.dict()
-        project.features_generated = True
-        
-        db.commit()
-        db.refresh(generated_features)
-        
-        # Get feature categories
-        new_date_features = [col for col in df.columns if col.startswith('date_') and col != project.date_column]
-        new_numeric_features = [col for col in df.columns if any(
-            suffix in col for suffix in ['_lag_', '_rolling_', '_trend_', '_change_']
-        )]
-        
-        return {
-            "generated_features_id": generated_features.id,
-            "total_features": len(df.columns),
-            "row_count": len(df),
-            "columns": df.columns.tolist(),
-            "new_date_features": new_date_features,
-            "new_numeric_features": new_numeric_features,
-            "sample_data": df.head(5).to_dict('records')
-        }
-        
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Error generating features: {str(e)}"
-        )
+            
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Error generating features: {str(e)}"
+            )
 
 @router.get("/projects/{project_id}/generated-features")
 def get_generated_features(
@@ -221,19 +269,60 @@ def get_generated_features(
         raise HTTPException(status_code=404, detail="No generated features found")
     
     # Return sample of data
-    sample_size = min(20, generated_features.row_count)
-    sample_data = generated_features.data[:sample_size] if generated_features.data else []
+    sample_data = artifact_sample(generated_features, min(20, generated_features.row_count or 0))
     
     return {
         "id": generated_features.id,
         "project_id": generated_features.project_id,
         "row_count": generated_features.row_count,
         "columns": generated_features.columns,
+        "artifact_size": generated_features.artifact_size,
         "feature_config": generated_features.feature_config,
         "sample_data": sample_data,
         "created_at": generated_features.created_at
     }
 
+@router.get("/projects/{project_id}/generated-features/rows", response_model=DataPageResponse)
+def get_generated_features_rows(
+    project_id: int,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=settings.ARTIFACT_PAGE_MAX_ROWS),
+    columns: Optional[List[str]] = Query(None),
+    date_from: Optional[Union[datetime, date]] = None,
+    date_to: Optional[Union[datetime, date]] = None,
+    products: Optional[List[str]] = Query(None),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Page through the generated features, optionally within a date range, for some
+    products and only some columns. Only the rows of the page are read.
+    """
+    # Verify project ownership
+    project = db.query(Project).filter(
+        Project.id == project_id,
+        Project.user_id == current_user.id
+    ).first()
+    
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    
+    generated_features = db.query(GeneratedFeatures).filter(
+        GeneratedFeatures.project_id == project_id
+    ).first()
+    
+    if not generated_features:
+        raise HTTPException(status_code=404, detail="No generated features found")
+    
+    try:
+        return artifact_page(
+            generated_features, offset, limit, columns,
+            date_column=project.date_column, date_from=date_from, date_to=date_to,
+            product_column=project.product_column, products=products
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.delete("/projects/{project_id}/generated-features")
 def delete_generated_features(
     project_id: int,
@@ -251,6 +340,9 @@ def delete_generated_features(
         raise HTTPException(status_code=404, detail="Project not found")
     
     # Delete generated features
+    artifact_paths = [path for (path,) in db.query(GeneratedFeatures.artifact_path).filter(
+        GeneratedFeatures.project_id == project_id
+    )]
     deleted_count = db.query(GeneratedFeatures).filter(
         GeneratedFeatures.project_id == project_id
     ).delete()
@@ -259,9 +351,64 @@ def delete_generated_features(
     project.features_generated = False
     
     db.commit()
+    delete_artifacts(artifact_paths)
     
     return {"message": f"Deleted {deleted_count} generated features record(s)"}
 
+@router.post("/projects/{project_id}/generated-features/export")
+def export_generated_features(
+    project_id: int,
+    include_aggregated: bool = False,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Materialize the generated features, and with include_aggregated the aggregated
+    data, as typed tables of the database (loaded with COPY, indexed on date and
+    product) for SQL tools to query directly. The tables are snapshots: export
+    again after regenerating.
+    """
+    # Verify project ownership
+    project = db.query(Project).filter(
+        Project.id == project_id,
+        Project.user_id == current_user.id
+    ).first()
+    
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    
+    generated_features = db.query(GeneratedFeatures).options(undefer(GeneratedFeatures.data)).filter(
+        GeneratedFeatures.project_id == project_id
+    ).first()
+    
+    if not generated_features:
+        raise HTTPException(status_code=404, detail="No generated features found")
+    
+    records = [(FEATURE_ARTIFACTS, generated_features)]
+    if include_aggregated:
+        aggregated_data = db.query(AggregatedData).options(undefer(AggregatedData.data)).filter(
+            AggregatedData.project_id == project_id
+        ).first()
+        
+        if not aggregated_data:
+            raise HTTPException(status_code=404, detail="No aggregated data found")
+        records.append((AGGREGATED_ARTIFACTS, aggregated_data))
+    
+    tables = []
+    for kind, record in records:
+        try:
+            tables.append(export_to_table(
+                engine, record, export_table_name(project_id, kind),
+                date_column=project.date_column, product_column=project.product_column
+            ))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    return {
+        "message": f"Exported {len(tables)} table(s)",
+        "tables": tables
+    }
+
 @router.get("/feature-options")
 def get_feature_options():
     """Get available feature generation options"""
@@ -1,6 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-import pandas as pd
 import numpy as np
 # from sklearn.model_selection import train_test_split, cross_val_score
 # from sklearn.ensemble import RandomForestRegressor
@@ -16,6 +15,8 @@ from models import User, Project, MLModel, DatabaseConnection
 from schemas import MLModelCreate, MLModel as MLModelSchema
 from routers.auth import get_current_user
 from config import settings
+from data_loader import load_file, load_query
+from db_engines import engine_registry
 
 router = APIRouter()
 
@@ -45,22 +46,15 @@ def train_model(
     try:
         # Load and prepare data
         if project.source_type == "file":
-            if project.file_path.endswith('.csv'):
-                df = pd.read_csv(project.file_path)
-            elif project.file_path.endswith(('.xlsx', '.xls')):
-                df = pd.read_excel(project.file_path)
-            elif project.file_path.endswith('.json'):
-                df = pd.read_json(project.file_path)
-            else:
+            if not project.file_path.endswith(('.csv', '.xlsx', '.xls', '.json')):
                 raise HTTPException(status_code=400, detail="Unsupported file format")
+            df = load_file(project.file_path)
         elif project.source_type == "db":
             db_conn = db.query(DatabaseConnection).filter(DatabaseConnection.id == project.db_connection_id).first()
             if not db_conn:
                 raise HTTPException(status_code=400, detail="Database connection not found")
             
-            connection_url = f"postgresql://{db_conn.username}:{db_conn.password}@{db_conn.host}:{db_conn.port}/{db_conn.database}"
-            query = project.query or f"SELECT * FROM {project.table_name}"
-            df = pd.read_sql(query, connection_url)
+            df = load_query(engine_registry.get(db_conn), table_name=project.table_name, query=project.query)
         else:
             raise HTTPException(status_code=400, detail="Invalid source type")
         
@@ -1,11 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select, func, and_
+from sqlalchemy.orm import Session, load_only, undefer_group
 from typing import List
 
-from database import get_db
-from models import User, Project
-from schemas import ProjectCreate, Project as ProjectSchema, ProjectUpdate
+from database import get_db, engine
+from models import User, Project, AdditionalFile, AggregatedData, GeneratedFeatures, MLModel
+from schemas import (
+    ProjectCreate, Project as ProjectSchema, ProjectSummary, ProjectUpdate, ProjectStatusSummary,
+    ProjectDashboardResponse
+)
 from routers.auth import get_current_user
+from file_storage import is_user_upload, retain_upload, release_upload, collect_unreferenced_uploads
+from incremental_aggregation import delete_checkpoint_states
+from artifacts import delete_project_artifacts
+from table_export import drop_export_tables
 
 router = APIRouter()
 
@@ -27,21 +35,108 @@ def create_project(
     
     return db_project
 
-@router.get("/projects", response_model=List[ProjectSchema])
+@router.get("/projects", response_model=List[ProjectSummary])
 def get_projects(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    projects = db.query(Project).filter(Project.user_id == current_user.id).all()
+    # Only the columns of the list entries are selected
+    projects = db.query(Project).options(
+        load_only(*[getattr(Project, field) for field in ProjectSummary.model_fields])
+    ).filter(Project.user_id == current_user.id).all()
     return projects
 
+def _per_project(model, user_id: int, *columns):
+    """Subquery of the given aggregates of model rows per project of the user"""
+    return select(model.project_id, *columns).join(
+        Project, Project.id == model.project_id
+    ).where(Project.user_id == user_id).group_by(model.project_id).subquery()
+
+@router.get("/projects/summary", response_model=ProjectDashboardResponse)
+def get_projects_summary(
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Dashboard view of the user's projects: status flags, numbers of additional
+    files and models, the latest model with its metrics and the stored result
+    sizes. Two queries (total and page) whatever the number of projects.
+    """
+    total = db.scalar(select(func.count(Project.id)).where(Project.user_id == current_user.id))
+    
+    files = _per_project(AdditionalFile, current_user.id, func.count(AdditionalFile.id).label("count"))
+    models = _per_project(MLModel, current_user.id, func.count(MLModel.id).label("count"))
+    aggregated = _per_project(
+        AggregatedData, current_user.id,
+        func.sum(AggregatedData.row_count).label("row_count"),
+        func.sum(AggregatedData.artifact_size).label("size")
+    )
+    features = _per_project(
+        GeneratedFeatures, current_user.id,
+        func.sum(GeneratedFeatures.row_count).label("row_count"),
+        func.sum(GeneratedFeatures.artifact_size).label("size")
+    )
+    
+    # Latest model of every project: first by creation time within the project
+    ranked_models = select(
+        MLModel.project_id, MLModel.id, MLModel.name, MLModel.model_type, MLModel.metrics, MLModel.created_at,
+        func.row_number().over(
+            partition_by=MLModel.project_id,
+            order_by=(MLModel.created_at.desc(), MLModel.id.desc())
+        ).label("position")
+    ).join(Project, Project.id == MLModel.project_id).where(Project.user_id == current_user.id).subquery()
+    
+    summary_columns = [getattr(Project, field) for field in ProjectSummary.model_fields]
+    rows = db.execute(
+        select(
+            *summary_columns,
+            func.coalesce(files.c.count, 0).label("additional_files_count"),
+            func.coalesce(models.c.count, 0).label("models_count"),
+            ranked_models.c.id.label("model_id"),
+            ranked_models.c.name.label("model_name"),
+            ranked_models.c.model_type,
+            ranked_models.c.metrics,
+            ranked_models.c.created_at.label("model_created_at"),
+            aggregated.c.row_count.label("aggregated_row_count"),
+            aggregated.c.size.label("aggregated_size"),
+            features.c.row_count.label("features_row_count"),
+            features.c.size.label("features_size")
+        )
+        .outerjoin(files, files.c.project_id == Project.id)
+        .outerjoin(models, models.c.project_id == Project.id)
+        .outerjoin(aggregated, aggregated.c.project_id == Project.id)
+        .outerjoin(features, features.c.project_id == Project.id)
+        .outerjoin(ranked_models, and_(ranked_models.c.project_id == Project.id, ranked_models.c.position == 1))
+        .where(Project.user_id == current_user.id)
+        .order_by(Project.updated_at.desc(), Project.id.desc())
+        .offset(offset)
+        .limit(limit)
+    ).mappings().all()
+    
+    projects = []
+    for row in rows:
+        summary = {field: row[field] for field in ProjectStatusSummary.model_fields if field in row}
+        summary["latest_model"] = {
+            "id": row["model_id"],
+            "name": row["model_name"],
+            "model_type": row["model_type"],
+            "metrics": row["metrics"],
+            "created_at": row["model_created_at"]
+        } if row["model_id"] is not None else None
+        projects.append(summary)
+    
+    return {"offset": offset, "limit": limit, "total": total, "projects": projects}
+
 @router.get("/projects/{project_id}", response_model=ProjectSchema)
 def get_project(
     project_id: int,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    project = db.query(Project).filter(
+    # The full project, feature settings included, in one query
+    project = db.query(Project).options(undefer_group("feature_settings")).filter(
         Project.id == project_id,
         Project.user_id == current_user.id
     ).first()
@@ -67,11 +162,29 @@ def update_project(
         raise HTTPException(status_code=404, detail="Project not found")
     
     # Update fields
-    for field, value in project_update.dict(exclude_unset=True).items():
+    updates = project_update.dict(exclude_unset=True)
+    previous_file = project.file_path
+    
+    # A project can only switch to a file the user uploaded
+    new_file = updates.get("file_path")
+    if new_file and new_file != previous_file and not is_user_upload(db, new_file, current_user.id):
+        raise HTTPException(status_code=400, detail="file_path must be a file uploaded by the user")
+    
+    for field, value in updates.items():
         setattr(project, field, value)
     
+    # Move the reference when the project switches to another stored file
+    file_changed = "file_path" in updates and updates["file_path"] != previous_file
+    if file_changed:
+        if project.file_path:
+            retain_upload(db, project.file_path)
+        if previous_file:
+            release_upload(db, previous_file)
+    
     db.commit()
     db.refresh(project)
+    if file_changed:
+        collect_unreferenced_uploads(db)
     
     return project
 
@@ -89,14 +202,16 @@ def delete_project(
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
-    # Delete associated file if exists
-    if project.file_path:
-        from pathlib import Path
-        file_path = Path(project.file_path)
-        if file_path.exists():
-            file_path.unlink()
+    # Release the project's files (removed with their cached artifacts once nothing uses them)
+    for file_path in [project.file_path] + [additional.file_path for additional in project.additional_files]:
+        if file_path:
+            release_upload(db, file_path)
     
     db.delete(project)
     db.commit()
+    collect_unreferenced_uploads(db)
+    delete_checkpoint_states(project_id)
+    delete_project_artifacts(project_id)
+    drop_export_tables(engine, project_id)
     
     return {"message": "Project deleted successfully"}
\ No newline at end of file
@@ -0,0 +1,38 @@
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+# create_all only creates missing tables, so columns and indexes added to
+# existing tables are applied here. Every statement must be idempotent: they
+# all run on each start, in order.
+SCHEMA_UPGRADES = [
+    # Additional files matched on the product column
+    "ALTER TABLE additional_files ADD COLUMN IF NOT EXISTS product_column VARCHAR",
+    # Aggregation results cached by a hash of their inputs
+    "ALTER TABLE aggregated_data ADD COLUMN IF NOT EXISTS cache_key VARCHAR",
+    "CREATE INDEX IF NOT EXISTS ix_aggregated_data_cache_key ON aggregated_data (cache_key)",
+    # Results stored as Parquet artifacts; the JSON rows are only kept for older results
+    "ALTER TABLE aggregated_data ADD COLUMN IF NOT EXISTS artifact_path VARCHAR",
+    "ALTER TABLE aggregated_data ADD COLUMN IF NOT EXISTS artifact_size INTEGER",
+    "ALTER TABLE aggregated_data ALTER COLUMN data DROP NOT NULL",
+    "ALTER TABLE generated_features ADD COLUMN IF NOT EXISTS artifact_path VARCHAR",
+    "ALTER TABLE generated_features ADD COLUMN IF NOT EXISTS artifact_size INTEGER",
+    "ALTER TABLE generated_features ALTER COLUMN data DROP NOT NULL",
+    # Per-project counts and lookups (project dashboard)
+    "CREATE INDEX IF NOT EXISTS ix_additional_files_project_id ON additional_files (project_id)",
+    "CREATE INDEX IF NOT EXISTS ix_aggregated_data_project_id ON aggregated_data (project_id)",
+    "CREATE INDEX IF NOT EXISTS ix_generated_features_project_id ON generated_features (project_id)",
+    "CREATE INDEX IF NOT EXISTS ix_ml_models_project_id ON ml_models (project_id)",
+]
+
+# Serializes the upgrade when several workers start at once
+UPGRADE_LOCK_ID = 720_411
+
+def upgrade_schema(engine: Engine):
+    """Bring tables created by earlier versions up to date (Postgres only; other databases are created fresh)"""
+    if engine.dialect.name != "postgresql":
+        return
+
+    with engine.begin() as conn:
+        conn.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": UPGRADE_LOCK_ID})
+        for statement in SCHEMA_UPGRADES:
+            conn.execute(text(statement))
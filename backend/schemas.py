@@ -100,6 +100,48 @@ class Project(BaseModel):
     class Config:
         from_attributes = True
 
+class ProjectSummary(BaseModel):
+    """Project list entry: status fields only, without the feature settings"""
+    id: int
+    name: str
+    description: Optional[str]
+    source_type: Optional[str]
+    date_column: Optional[str]
+    value_column: Optional[str]
+    product_column: Optional[str]
+    aggregation_period: Optional[str]
+    aggregation_completed: bool
+    features_generated: bool
+    created_at: datetime
+    updated_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+# Dashboard schemas
+class LatestModelSummary(BaseModel):
+    id: int
+    name: str
+    model_type: str
+    metrics: Optional[Dict[str, Any]]
+    created_at: datetime
+
+class ProjectStatusSummary(ProjectSummary):
+    """Dashboard entry: the list entry with counts, latest model and stored result sizes"""
+    additional_files_count: int
+    models_count: int
+    latest_model: Optional[LatestModelSummary]
+    aggregated_row_count: Optional[int]
+    aggregated_size: Optional[int]  # bytes of the stored artifacts
+    features_row_count: Optional[int]
+    features_size: Optional[int]
+
+class ProjectDashboardResponse(BaseModel):
+    offset: int
+    limit: int
+    total: int
+    projects: List[ProjectStatusSummary]
+
 # Additional File schemas
 class AdditionalFileCreate(BaseModel):
     file_name: str
@@ -109,7 +151,7 @@ class AdditionalFileCreate(BaseModel):
 class AdditionalFileColumnMapping(BaseModel):
     additional_file_id: int
     date_column: str
-    product_column: Optional[str] = None  # NEW: Product column for matching
+    product_column: Optional[str] = None  # Product column for matching
     selected_columns: List[str]
     column_aggregations: Dict[str, str]  # {column_name: aggregation_function}
     fill_method: str = 'zero'
@@ -121,6 +163,7 @@ class AdditionalFile(BaseModel):
     file_path: str
     file_type: str
     date_column: Optional[str]
+    product_column: Optional[str] = None
     selected_columns: Optional[List[str]]
     column_aggregations: Optional[Dict[str, str]]
     fill_method: str
@@ -145,6 +188,10 @@ class AggregationConfig(BaseModel):
     period: str  # 'daily', 'weekly', 'monthly'
     main_value_aggregation: str  # 'mean', 'sum', 'max', 'min'
     additional_file_aggregations: Optional[List[Dict[str, Any]]] = None
+    streaming: Optional[bool] = None  # chunked out-of-core aggregation; None = automatic for large files
+    incremental: bool = False  # only read rows appended since the previous incremental run
+    use_cache: bool = True  # return the stored result when the inputs are unchanged
+    memory_budget_mb: Optional[int] = None  # overrides MEMORY_BUDGET_MB; set = downcast dtypes
 
 class DateFeatures(BaseModel):
     month: bool = False
@@ -196,4 +243,26 @@ class AggregatedDataResponse(BaseModel):
     created_at: datetime
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+# Paginated rows of aggregated data / generated features
+class DataPageResponse(BaseModel):
+    offset: int
+    limit: int
+    total: int  # rows matching the filters
+    columns: List[str]
+    rows: List[Dict[str, Any]]
+
+# Background job schemas
+class JobResponse(BaseModel):
+    job_id: str
+    kind: str
+    params: Optional[Dict[str, Any]] = None
+    status: str  # 'queued', 'running', 'completed', 'failed'
+    progress: float
+    message: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
\ No newline at end of file
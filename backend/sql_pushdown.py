@@ -0,0 +1,63 @@
+from sqlalchemy import select, func, cast, literal_column, DateTime, Float
+from sqlalchemy.sql import Select
+from typing import Optional
+
+from data_loader import build_source_query
+
+# Aggregation functions Postgres can compute with the same result as pandas
+PUSHDOWN_FUNCTIONS = {
+    'sum': lambda col: func.coalesce(func.sum(col), 0),  # pandas sums empty groups to 0
+    'mean': lambda col: func.avg(col),
+    'max': lambda col: func.max(col),
+    'min': lambda col: func.min(col),
+    'count': lambda col: func.count(col),
+    'median': lambda col: func.percentile_cont(0.5).within_group(col),
+    'std': lambda col: func.stddev_samp(col),
+}
+
+def period_bucket(date_col, period: str):
+    """
+    Period label expression matching pandas resample labels:
+    'D' -> day, 'W' -> week ending Sunday, 'M' -> last day of month
+    """
+    timestamp = cast(date_col, DateTime)
+
+    if period == 'weekly':
+        return func.date_trunc('week', timestamp) + literal_column("INTERVAL '6 days'")
+    elif period == 'monthly':
+        return func.date_trunc('month', timestamp) + literal_column("INTERVAL '1 month' - INTERVAL '1 day'")
+    return func.date_trunc('day', timestamp)
+
+def build_aggregation_query(table_name: str, query: str, date_column: str, value_column: str,
+                            period: str, agg_func: str, product_column: str = None) -> Optional[Select]:
+    """
+    Compile the period aggregation into a GROUP BY query so only aggregated rows
+    are transferred. Returns None when the aggregation function cannot be pushed
+    down, in which case the caller aggregates in pandas.
+    """
+    if agg_func not in PUSHDOWN_FUNCTIONS:
+        return None
+
+    columns = [date_column, value_column] + ([product_column] if product_column else [])
+    src = build_source_query(table_name, query, columns).subquery('pushdown_src')
+
+    bucket = period_bucket(src.c[date_column], period).label(date_column)
+    value_col = src.c[value_column]
+    if agg_func not in ('count', 'max', 'min'):
+        value_col = cast(value_col, Float)
+    value = PUSHDOWN_FUNCTIONS[agg_func](value_col).label(value_column)
+
+    group_by = [bucket]
+    selected = [bucket, value]
+    if product_column:
+        product = src.c[product_column].label(product_column)
+        selected.append(product)
+        group_by.append(product)
+
+    return (
+        select(*selected)
+        .select_from(src)
+        .where(src.c[date_column].isnot(None))
+        .group_by(*group_by)
+        .order_by(*reversed(group_by))
+    )
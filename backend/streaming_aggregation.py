@@ -0,0 +1,233 @@
+import pandas as pd
+import numpy as np
+from typing import Dict, Iterable, List, Optional
+
+from periods import period_codes, period_labels, complete_periods
+
+# Partial states kept per (product, period) for each aggregation function
+STATE_COLUMNS = {
+    'sum': ['sum'],
+    'count': ['count'],
+    'mean': ['sum', 'count'],
+    'min': ['min'],
+    'max': ['max'],
+    'std': ['count', 'mean', 'm2'],  # m2: sum of squared deviations from the mean
+    'first': ['first', 'first_date'],  # value at the earliest date with one, and that date
+    'last': ['last', 'last_date'],
+}
+
+# How partial states of the same group are merged; 'mean' / 'm2' and the
+# first / last values with their dates are merged together (see _merge)
+STATE_MERGE = {
+    'sum': 'sum',
+    'count': 'sum',
+    'min': 'min',
+    'max': 'max',
+}
+
+def can_stream(aggregations: Dict[str, str]) -> bool:
+    """Whether all aggregation functions can be computed from mergeable partial states"""
+    return all(agg_func in STATE_COLUMNS for agg_func in aggregations.values())
+
+def _merge_moments(count: pd.Series, mean: pd.Series, m2: pd.Series, level: List[int]) -> pd.DataFrame:
+    """
+    Count, mean and sum of squared deviations of groups made of several partial
+    states (Chan et al.'s parallel formula): deviations are taken from the means,
+    never from raw sums of squares, so large values do not cancel out.
+    """
+    valid = count > 0
+    mean = mean.where(valid)
+    grouped = lambda values: values.groupby(level=level, sort=False)
+
+    total = grouped(count).sum()
+    # Shift by one of the group's means before weighting, to keep the sums small
+    reference = grouped(mean).first().reindex(mean.index)
+    shift = grouped((count * (mean - reference)).where(valid, 0.0)).sum() / total.where(total > 0)
+    merged_mean = grouped(mean).first() + shift
+
+    deviation = mean - merged_mean.reindex(mean.index)
+    m2 = grouped(m2.where(valid, 0.0)).sum() + grouped((count * deviation ** 2).where(valid, 0.0)).sum()
+    return pd.DataFrame({"count": total, "mean": merged_mean, "m2": m2})
+
+def _merge_dated(values: pd.Series, dates: pd.Series, level: List[int], last: bool) -> pd.DataFrame:
+    """
+    Value at the earliest (or latest) date of each group. Ties keep the state that
+    came first (or last), matching a stable sort by date of the whole source.
+    """
+    order = np.argsort(dates.to_numpy(), kind='stable')  # NaT (no value) sorts last
+    values, dates = values.iloc[order], dates.iloc[order]
+    grouped_values = values.groupby(level=level, sort=False)
+    grouped_dates = dates.groupby(level=level, sort=False)
+    if last:
+        return pd.DataFrame({"value": grouped_values.last(), "date": grouped_dates.max()})
+    return pd.DataFrame({"value": grouped_values.first(), "date": grouped_dates.min()})
+
+class IncrementalAggregator:
+    """
+    Aggregate a source chunk by chunk into periods (and products) with bounded memory.
+
+    Each chunk is reduced to partial states per group (sum, count, min, max,
+    count / mean / sum of squared deviations, first / last value with its date)
+    which are merged into the running state, so only one chunk and one row per
+    group are held at a time. Chunks can arrive in any order: 'first' and 'last'
+    are taken by date, ties in the order rows were passed in. result() returns
+    the same frame as aggregating the whole source at once.
+    """
+
+    def __init__(self, date_column: str, period: str, aggregations: Dict[str, str],
+                 product_column: str = None):
+        if not can_stream(aggregations):
+            raise ValueError(f"Aggregations cannot be computed incrementally: {aggregations}")
+
+        self.date_column = date_column
+        self.period = period
+        self.aggregations = aggregations
+        self.product_column = product_column
+        self.rows = 0
+        self._state = None
+        self.categorical = False
+
+    @property
+    def _keys(self) -> List[str]:
+        return ['product', 'code'] if self.product_column else ['code']
+
+    def _state_columns(self) -> List[str]:
+        return [f"{col}__{stat}" for col, agg_func in self.aggregations.items() for stat in STATE_COLUMNS[agg_func]]
+
+    def update(self, chunk: pd.DataFrame):
+        """Merge one chunk of source rows into the running state"""
+        chunk = chunk[chunk[self.date_column].notna()]
+        if chunk.empty:
+            return
+        self.rows += len(chunk)
+
+        dates = pd.to_datetime(chunk[self.date_column])
+        groups = {'code': period_codes(dates, self.period)}
+        if self.product_column:
+            product = chunk[self.product_column]
+            # categories can differ between chunks, so group on the plain values
+            self.categorical = self.categorical or isinstance(product.dtype, pd.CategoricalDtype)
+            groups['product'] = product.to_numpy(dtype=object)
+
+        frame = pd.DataFrame(groups, index=chunk.index)
+        dated = {'first', 'last'} & set(self.aggregations.values())
+        for col, agg_func in self.aggregations.items():
+            values = chunk[col]
+            if agg_func in ('sum', 'mean', 'std'):
+                values = pd.to_numeric(values, errors='coerce')
+            frame[col] = values
+            if agg_func in dated:
+                # date of each value, so first / last can be compared across chunks
+                frame[f"{col}__date"] = dates.where(values.notna())
+        if dated and not dates.is_monotonic_increasing:
+            frame = frame.iloc[np.argsort(dates.to_numpy(), kind='stable')]
+
+        grouped = frame.groupby(self._keys, sort=False)
+        partial = {}
+        for col, agg_func in self.aggregations.items():
+            values = grouped[col]
+            if agg_func in ('first', 'last'):
+                partial[f"{col}__{agg_func}"] = getattr(values, agg_func)()
+                dates_of = grouped[f"{col}__date"]
+                partial[f"{col}__{agg_func}_date"] = dates_of.min() if agg_func == 'first' else dates_of.max()
+            elif agg_func == 'std':
+                count = values.count()
+                partial[f"{col}__count"] = count
+                partial[f"{col}__mean"] = values.mean()
+                partial[f"{col}__m2"] = values.var(ddof=0) * count
+            else:
+                for stat in STATE_COLUMNS[agg_func]:
+                    partial[f"{col}__{stat}"] = values.count() if stat == 'count' else getattr(values, stat)()
+
+        self._merge(pd.DataFrame(partial)[self._state_columns()])
+
+    def _merge(self, partial: pd.DataFrame):
+        if self._state is None:
+            self._state = partial
+            return
+
+        combined = pd.concat([self._state, partial])
+        level = list(range(len(self._keys)))
+        merged = {}
+        for col, agg_func in self.aggregations.items():
+            if agg_func in ('first', 'last'):
+                state = _merge_dated(
+                    combined[f"{col}__{agg_func}"], combined[f"{col}__{agg_func}_date"], level, agg_func == 'last'
+                )
+                merged[f"{col}__{agg_func}"] = state["value"]
+                merged[f"{col}__{agg_func}_date"] = state["date"]
+            elif agg_func == 'std':
+                state = _merge_moments(
+                    combined[f"{col}__count"], combined[f"{col}__mean"], combined[f"{col}__m2"], level
+                )
+                for stat in STATE_COLUMNS['std']:
+                    merged[f"{col}__{stat}"] = state[stat]
+            else:
+                for stat in STATE_COLUMNS[agg_func]:
+                    name = f"{col}__{stat}"
+                    merged[name] = combined[name].groupby(level=level, sort=False).agg(STATE_MERGE[stat])
+
+        self._state = pd.DataFrame(merged)[self._state_columns()]
+
+    def last_code(self) -> Optional[int]:
+        """Code of the latest period in the state (the open period of an appended source)"""
+        if self._state is None or self._state.empty:
+            return None
+        return int(self._state.index.get_level_values('code').max())
+
+    def discard_from(self, code: int):
+        """Drop the partial states of period code and later, to re-read those periods"""
+        if self._state is not None:
+            self._state = self._state[self._state.index.get_level_values('code') < code]
+
+    def save_state(self, path):
+        """Write the partial states to a Parquet file (see load_state)"""
+        state = self._state if self._state is not None else pd.DataFrame(
+            columns=self._keys + self._state_columns()
+        ).set_index(self._keys)
+        state.reset_index().to_parquet(path, index=False)
+
+    def load_state(self, path, categorical: bool = False):
+        """Continue from partial states saved by save_state"""
+        state = pd.read_parquet(path)
+        self._state = state.set_index(self._keys) if not state.empty else None
+        self.categorical = categorical
+
+    def result(self) -> pd.DataFrame:
+        """Final aggregated frame with one row per period (and product)"""
+        columns = [self.date_column] + list(self.aggregations)
+        if self.product_column:
+            columns.append(self.product_column)
+        if self._state is None:
+            return pd.DataFrame(columns=columns)
+
+        state = self._state.sort_index()
+        result = pd.DataFrame(index=state.index)
+        for col, agg_func in self.aggregations.items():
+            if agg_func == 'mean':
+                count = state[f"{col}__count"]
+                result[col] = state[f"{col}__sum"] / count.where(count > 0)
+            elif agg_func == 'std':
+                count = state[f"{col}__count"]
+                result[col] = np.sqrt(state[f"{col}__m2"] / (count - 1).where(count > 1))
+            else:
+                result[col] = state[f"{col}__{agg_func}"]
+
+        codes = state.index.get_level_values('code')
+        result[self.date_column] = period_labels(codes, self.period)
+        if self.product_column:
+            product = state.index.get_level_values('product')
+            if self.categorical:
+                product = pd.Categorical(product)
+            result[self.product_column] = product
+
+        result = result.reset_index(drop=True)[columns]
+        return complete_periods(result, self.date_column, self.period, self.aggregations, self.product_column)
+
+def aggregate_chunks(chunks: Iterable[pd.DataFrame], date_column: str, period: str,
+                     aggregations: Dict[str, str], product_column: str = None) -> pd.DataFrame:
+    """Aggregate an iterable of DataFrame chunks with an IncrementalAggregator"""
+    aggregator = IncrementalAggregator(date_column, period, aggregations, product_column)
+    for chunk in chunks:
+        aggregator.update(chunk)
+    return aggregator.result()
@@ -0,0 +1,127 @@
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+from sqlalchemy.engine import Engine
+from typing import Any, Dict, Iterator, List, Optional
+from itertools import chain
+import io
+
+from config import settings
+from artifacts import ARTIFACT_KINDS, read_artifact
+
+def export_table_name(project_id: int, kind: str) -> str:
+    """Name of the table a project's aggregated data or features are exported to, e.g. _gf_project_7_features"""
+    return f"{settings.EXPORT_TABLE_PREFIX}_project_{project_id}_{kind}"
+
+def _postgres_type(arrow_type: pa.DataType) -> str:
+    if pa.types.is_dictionary(arrow_type):
+        return _postgres_type(arrow_type.value_type)
+    if pa.types.is_boolean(arrow_type):
+        return "BOOLEAN"
+    if pa.types.is_integer(arrow_type):
+        return "BIGINT" if arrow_type.bit_width > 16 else "INTEGER"
+    if pa.types.is_floating(arrow_type):
+        return "REAL" if arrow_type.bit_width <= 32 else "DOUBLE PRECISION"
+    if pa.types.is_timestamp(arrow_type):
+        return "TIMESTAMPTZ" if arrow_type.tz else "TIMESTAMP"
+    if pa.types.is_date(arrow_type):
+        return "DATE"
+    return "TEXT"
+
+def _decoded(schema: pa.Schema) -> pa.Schema:
+    """Schema with dictionary (categorical) columns as their plain values, which the CSV writer needs"""
+    return pa.schema([
+        field.with_type(field.type.value_type) if pa.types.is_dictionary(field.type) else field
+        for field in schema
+    ])
+
+def _record_batches(record) -> Iterator[pa.RecordBatch]:
+    """Stored frame batch by batch (legacy JSON rows are converted at once)"""
+    if record.artifact_path:
+        parquet_file = pq.ParquetFile(record.artifact_path)
+        yield from parquet_file.iter_batches(batch_size=settings.EXPORT_COPY_BATCH_ROWS)
+    else:
+        yield from pa.Table.from_pandas(read_artifact(record), preserve_index=False).to_batches(
+            max_chunksize=settings.EXPORT_COPY_BATCH_ROWS
+        )
+
+def _csv_chunk(batch: pa.RecordBatch) -> io.BytesIO:
+    """
+    Batch as headerless CSV for COPY: strings are always quoted and nulls left
+    empty, so empty strings and NULLs stay distinct
+    """
+    buffer = io.BytesIO()
+    table = pa.Table.from_batches([batch]).cast(_decoded(batch.schema))
+    pa_csv.write_csv(table, buffer, pa_csv.WriteOptions(include_header=False))
+    buffer.seek(0)
+    return buffer
+
+def export_to_table(engine: Engine, record, table_name: str, date_column: str = None,
+                    product_column: str = None) -> Dict[str, Any]:
+    """
+    Load a stored frame into a typed table of the Postgres database with COPY
+    (CSV), replacing the table if it exists, then index it on the date and on
+    (product, date). Everything runs in one transaction, so readers see either
+    the previous table or the complete new one.
+    """
+    batches = _record_batches(record)
+    first = next(batches, None)
+    if first is None:
+        raise ValueError("There are no rows to export")
+    schema = first.schema
+
+    quote = engine.dialect.identifier_preparer.quote
+    table = quote(table_name)
+    column_list = ", ".join(quote(field.name) for field in schema)
+    column_definitions = ", ".join(f"{quote(field.name)} {_postgres_type(field.type)}" for field in schema)
+
+    row_count = 0
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute(f"DROP TABLE IF EXISTS {table}")
+        cursor.execute(f"CREATE TABLE {table} ({column_definitions})")
+
+        copy_sql = f"COPY {table} ({column_list}) FROM STDIN WITH (FORMAT csv)"
+        for batch in chain([first], batches):
+            cursor.copy_expert(copy_sql, _csv_chunk(batch))
+            row_count += batch.num_rows
+
+        # Date ranges over all products, and one product's rows in date order
+        date_key = [date_column] if date_column in schema.names else []
+        indexes = {"date": date_key}
+        if product_column in schema.names:
+            indexes["product"] = [product_column] + date_key
+        indexes = {suffix: columns for suffix, columns in indexes.items() if columns}
+        for suffix, columns in indexes.items():
+            cursor.execute(
+                f"CREATE INDEX {quote(f'{table_name}_{suffix}_idx')} ON {table} "
+                f"({', '.join(quote(col) for col in columns)})"
+            )
+        cursor.execute(f"ANALYZE {table}")
+
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+
+    return {
+        "table": table_name,
+        "row_count": row_count,
+        "columns": schema.names,
+        "indexes": list(indexes.values())
+    }
+
+def drop_export_tables(engine: Engine, project_id: int, kinds: Optional[List[str]] = None):
+    """Drop the exported tables of a project (all kinds by default)"""
+    quote = engine.dialect.identifier_preparer.quote
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        for kind in kinds or ARTIFACT_KINDS:
+            cursor.execute(f"DROP TABLE IF EXISTS {quote(export_table_name(project_id, kind))}")
+        connection.commit()
+    finally:
+        connection.close()
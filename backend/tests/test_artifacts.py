@@ -0,0 +1,46 @@
+import pandas as pd
+import pytest
+
+from config import settings
+from artifacts import AGGREGATED_ARTIFACTS, write_artifact, artifact_page
+
+
+class Record:
+    """Stand-in for an AggregatedData row"""
+
+    def __init__(self, df: pd.DataFrame, artifact_path: str = None):
+        self.artifact_path = artifact_path
+        self.columns = df.columns.tolist()
+        self.data = None if artifact_path else df.to_dict('records')
+
+
+@pytest.fixture
+def frame() -> pd.DataFrame:
+    return pd.DataFrame({
+        "date": pd.to_datetime(["2023-01-01", "2023-01-08"] * 2),
+        "sales": [1.0, 2.0, 3.0, 4.0],
+        "product": [7, 7, 9, 9],
+    })
+
+
+@pytest.fixture
+def stored(tmp_path, monkeypatch, frame) -> Record:
+    monkeypatch.setattr(settings, "ARTIFACTS_DIR", str(tmp_path))
+    path, _ = write_artifact(frame, AGGREGATED_ARTIFACTS, 1)
+    return Record(frame, path)
+
+
+def page(record, products):
+    return artifact_page(record, 0, 10, product_column="product", products=products)
+
+
+def test_numeric_product_filter(stored):
+    result = page(stored, ["9"])
+    assert result["total"] == 2
+    assert [row["product"] for row in result["rows"]] == [9, 9]
+
+
+def test_numeric_product_filter_with_text_value(stored, frame):
+    assert page(stored, ["X9"])["total"] == 0
+    assert page(stored, ["X9", "7"])["total"] == 2
+    assert page(Record(frame), ["X9", "7"])["total"] == 2
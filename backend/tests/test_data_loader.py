@@ -0,0 +1,45 @@
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+import data_loader
+from config import settings
+from data_loader import ensure_columnar, iter_file_chunks
+
+
+@pytest.fixture
+def chunked(monkeypatch):
+    """Every file counts as large and is converted two rows at a time"""
+    monkeypatch.setattr(settings, "AGGREGATION_STREAMING_THRESHOLD", 0)
+    monkeypatch.setattr(settings, "AGGREGATION_CHUNK_ROWS", 2)
+
+    def full_parse(*args, **kwargs):
+        raise AssertionError("the whole file was parsed at once")
+
+    monkeypatch.setattr(data_loader, "read_source_file", full_parse)
+
+
+def test_large_json_lines_converted_in_chunks(tmp_path, chunked):
+    frame = pd.DataFrame({
+        "date": pd.date_range("2023-01-01", periods=5).strftime("%Y-%m-%d"),
+        "sales": [1.5, 2.0, 3.25, 4.0, 5.5],
+    })
+    path = tmp_path / "data.json"
+    path.write_text(frame.to_json(orient="records", lines=True))
+
+    cache_path = ensure_columnar(path)
+    assert cache_path is not None
+    assert pq.ParquetFile(cache_path).num_row_groups == 3
+
+    result = pd.concat(iter_file_chunks(path, columns=["date", "sales"], parse_dates=["date"]), ignore_index=True)
+    assert result["sales"].tolist() == frame["sales"].tolist()
+    assert pd.api.types.is_datetime64_any_dtype(result["date"])
+
+
+def test_json_lines_type_change_read_as_text(tmp_path, chunked):
+    path = tmp_path / "data.json"
+    path.write_text('{"sales": 1}\n{"sales": 2}\n{"sales": "n/a"}\n{"sales": 4}\n')
+
+    assert ensure_columnar(path) is None
+    result = pd.concat(iter_file_chunks(path), ignore_index=True)
+    assert result["sales"].tolist() == [1, 2, "n/a", 4]
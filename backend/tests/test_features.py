@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from schemas import NumericalFeatures
+from routers.features import generate_numerical_features
+
+
+def _two_products() -> pd.DataFrame:
+    dates = pd.date_range("2023-01-01", periods=4, freq="W")
+    return pd.DataFrame({
+        "date": list(dates) * 2,
+        "sales": [1.0, 2.0, 4.0, 8.0, 100.0, 200.0, 400.0, 800.0],
+        "product": ["A"] * 4 + ["B"] * 4,
+    })
+
+
+def test_lags_do_not_cross_products():
+    features = NumericalFeatures(lag_periods=[1], rolling_windows=[2], change_periods=[1])
+    df = generate_numerical_features(_two_products(), ["sales"], features, product_column="product")
+
+    first_rows = df.groupby("product").head(1)
+    assert first_rows["sales_lag_1"].isna().all()
+    assert first_rows["sales_rolling_2"].isna().all()
+    assert first_rows["sales_change_1"].isna().all()
+
+    product_b = df[df["product"] == "B"]
+    assert product_b["sales_lag_1"].tolist()[1:] == [100.0, 200.0, 400.0]
+    assert product_b["sales_rolling_2"].tolist()[1:] == [150.0, 300.0, 600.0]
+    assert product_b["sales_change_1"].tolist()[1:] == [1.0, 1.0, 1.0]
+
+
+def test_trend_per_product():
+    features = NumericalFeatures(include_trend_features=True, trend_periods=[2])
+    df = generate_numerical_features(_two_products(), ["sales"], features, product_column="product")
+
+    assert np.isnan(df.loc[4, "sales_trend_2"])
+    assert df.loc[5, "sales_trend_2"] == pytest.approx(100.0)
+
+
+def test_single_series_without_product_column():
+    features = NumericalFeatures(lag_periods=[1])
+    df = generate_numerical_features(_two_products(), ["sales"], features)
+
+    assert df.loc[4, "sales_lag_1"] == 8.0
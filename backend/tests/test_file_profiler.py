@@ -0,0 +1,45 @@
+import pandas as pd
+import pytest
+
+from file_profiler import is_json_lines, profile_file
+from data_loader import read_source_file
+
+
+@pytest.fixture
+def frame() -> pd.DataFrame:
+    return pd.DataFrame({"date": ["2023-01-01", "2023-01-02", "2023-01-03"], "sales": [1, 2, 3]})
+
+
+@pytest.mark.parametrize("indent", [None, 2])
+def test_single_object_json(tmp_path, frame, indent):
+    path = tmp_path / "data.json"
+    path.write_text(frame.to_json(indent=indent))
+
+    assert not is_json_lines(path)
+    assert profile_file(path)["row_count"] == 3
+    assert read_source_file(path).shape == (3, 2)
+
+
+def test_json_array(tmp_path, frame):
+    path = tmp_path / "data.json"
+    path.write_text(frame.to_json(orient="records"))
+
+    assert not is_json_lines(path)
+    assert read_source_file(path).shape == (3, 2)
+
+
+def test_json_lines(tmp_path, frame):
+    path = tmp_path / "data.json"
+    path.write_text(frame.to_json(orient="records", lines=True))
+
+    assert is_json_lines(path)
+    assert profile_file(path)["row_count"] == 3
+    assert read_source_file(path).shape == (3, 2)
+
+
+def test_json_lines_single_record(tmp_path, frame):
+    path = tmp_path / "data.json"
+    path.write_text(frame.head(1).to_json(orient="records", lines=True))
+
+    assert is_json_lines(path)
+    assert read_source_file(path).shape == (1, 2)